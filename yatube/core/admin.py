@@ -0,0 +1,15 @@
+"""Display models in the admin panel."""
+
+from django.contrib import admin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Background tasks and their failures."""
+
+    list_display = ('pk', 'name', 'status', 'attempts', 'run_at', 'key')
+    list_filter = ('status', 'name')
+    search_fields = ('key',)
+    readonly_fields = ('created', 'finished', 'last_error')
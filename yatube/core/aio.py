@@ -0,0 +1,49 @@
+"""Database work of async views.
+
+The ORM is synchronous. ``run`` calls a function in the thread of the
+request, like ``sync_to_async`` does by default; ``gather`` runs
+independent calls at once, each in a worker thread with a connection of
+its own, and returns their results in order. Queries of the workers are
+added to the timing of the request (see ``core.timing``).
+
+The worker threads are pooled, so after every call a worker closes its
+connections like the end of a request does: once they are older than
+``CONN_MAX_AGE`` or broken.
+
+An in-memory SQLite database (the test database) is private to one
+connection, so there ``gather`` makes the calls one by one in the
+thread of the request instead.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connections
+
+
+async def run(func, *args, **kwargs):
+    """Call a synchronous function in the thread of the request."""
+    return await sync_to_async(func)(*args, **kwargs)
+
+
+def is_shared():
+    """Whether other connections see the data of the request's one."""
+    return not any(
+        connection.is_in_memory_db() for connection in connections.all()
+    )
+
+
+def call_in_worker(func):
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+async def gather(*calls):
+    """Make independent calls concurrently and return their results."""
+    if not is_shared():
+        return [await run(call) for call in calls]
+    return await asyncio.gather(*(
+        sync_to_async(call_in_worker, thread_sensitive=False)(call)
+        for call in calls
+    ))
@@ -0,0 +1,280 @@
+"""Page cache that survives expiry under load.
+
+``cache_response`` is a drop-in for ``cache_page`` that keeps one worker
+recomputing an entry while the others are served the stale copy, and
+refreshes hot entries a little before they expire (probabilistic early
+expiration), so an expiring page never makes every worker render it
+at once.
+
+With a ``version`` the key of a page stays the same across versions of
+its data, and an entry of an old version is served like an expired one:
+after an invalidation one worker renders the page while the others get
+the previous copy. Such a request gets ``STALE_VERSION_ATTR`` set to the
+version of the copy, so validators of the current version (see
+``posts.conditional``) aren't sent with an older page.
+
+Coroutine views are cached natively: the view is awaited in the event
+loop and only the cache calls go to the request's thread.
+"""
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import time
+from collections import Counter, namedtuple
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import has_vary_header
+
+from core import aio, metrics, timing
+
+KEY_PREFIX = 'response-cache'
+LOCK_POLL_INTERVAL = 0.05
+STALE_VERSION_ATTR = 'stale_version'
+
+HIT, COMPUTE, WAIT = 'hit', 'compute', 'wait'
+
+CachedResponse = namedtuple(
+    'CachedResponse', 'response expires delta version', defaults=(None,)
+)
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def count(name, event):
+    """Add one to the counter of an event."""
+    with _stats_lock:
+        _stats[f'{name}.{event}'] += 1
+    metrics.CACHE_EVENTS.labels(name, event).inc()
+    # Stale copies and waits for the lock are served from the cache too.
+    timing.count('cache_misses' if event == 'misses' else 'cache_hits')
+
+
+def get_stats():
+    """Return counters of hits, misses, stale serves and lock waits."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def is_expiring(entry, beta):
+    """Decide whether an entry should be recomputed now (XFetch)."""
+    if beta <= 0:
+        return time.time() >= entry.expires
+    jitter = entry.delta * beta * -math.log(1.0 - random.random())
+    return time.time() + jitter >= entry.expires
+
+
+def is_cacheable(request, response):
+    if response.streaming or response.status_code != 200:
+        return False
+    if 'private' in response.get('Cache-Control', ''):
+        return False
+    return not (
+        not request.COOKIES
+        and response.cookies
+        and has_vary_header(response, 'Cookie')
+    )
+
+
+def get_cache_key(request, key_prefix):
+    """Key of a page: prefix, reader and full URL."""
+    user = getattr(request, 'user', None)
+    reader = user.pk if user is not None and user.is_authenticated else 0
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'{KEY_PREFIX}.{key_prefix}.{reader}.{url}'
+
+
+class PageCache:
+    """Lookup, locking and storage of the cached pages of one view.
+
+    The cache calls of a request are grouped in ``lookup``, ``poll`` and
+    ``store``, so an async view makes them in few trips to a thread.
+    """
+
+    def __init__(self, timeout, key_prefix, version, name, stale_timeout,
+                 lock_timeout, beta):
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self.version = version
+        self.name = name
+        self.stale_timeout = stale_timeout
+        self.lock_timeout = lock_timeout
+        self.beta = beta
+
+    def get_key(self, request, args, kwargs):
+        """Key and version of the page a request asks for."""
+        prefix = self.key_prefix
+        if callable(prefix):
+            prefix = prefix(request, *args, **kwargs)
+        version = None
+        if self.version is not None:
+            version = self.version(request, *args, **kwargs)
+        return get_cache_key(request, prefix), version
+
+    def is_fresh(self, entry, version):
+        return entry.version == version and not is_expiring(entry, self.beta)
+
+    def lookup(self, request, args, kwargs):
+        """Find the page and decide what the request does about it.
+
+        Return the key, the version, the action (``HIT``, ``COMPUTE``
+        holding the lock, or ``WAIT`` for the worker holding it) and
+        the entry to serve.
+        """
+        key, version = self.get_key(request, args, kwargs)
+        entry = cache.get(key)
+        if entry is not None and self.is_fresh(entry, version):
+            count(self.name, 'hits')
+            return key, version, HIT, entry
+        if cache.add(f'{key}.lock', 1, self.lock_timeout):
+            count(self.name, 'misses')
+            return key, version, COMPUTE, None
+        if entry is not None:
+            current = entry.version == version and time.time() < entry.expires
+            count(self.name, 'hits' if current else 'stale')
+            return key, version, HIT, entry
+        count(self.name, 'lock_waits')
+        return key, version, WAIT, None
+
+    def poll(self, key):
+        """Return the stored page and whether it is still worth waiting."""
+        entry = cache.get(key)
+        if entry is not None:
+            return entry, False
+        if cache.get(f'{key}.lock') is None:
+            return cache.get(key), False
+        return None, True
+
+    def wait(self, key):
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            entry, waiting = self.poll(key)
+            if not waiting:
+                return entry
+        return cache.get(key)
+
+    async def await_page(self, key):
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            entry, waiting = await aio.run(self.poll, key)
+            if not waiting:
+                return entry
+        return await aio.run(cache.get, key)
+
+    def store(self, request, key, version, response, started, locked):
+        """Keep a rendered page and release the lock taken for it."""
+        try:
+            if is_cacheable(request, response):
+                entry = CachedResponse(
+                    response,
+                    time.time() + self.timeout,
+                    time.monotonic() - started,
+                    version,
+                )
+                cache.set(key, entry, self.timeout + self.stale_timeout)
+        finally:
+            if locked:
+                self.release(key)
+
+    def release(self, key):
+        cache.delete(f'{key}.lock')
+
+    def serve(self, request, version, entry):
+        """Return the stored page, marking a request given an old one."""
+        if entry.version != version:
+            setattr(request, STALE_VERSION_ATTR, entry.version)
+        return entry.response
+
+
+def render_response(response):
+    if callable(getattr(response, 'render', None)):
+        return response.render()
+    return response
+
+
+def cache_response(timeout, key_prefix='', name='default', version=None,
+                   stale_timeout=None, lock_timeout=10, beta=1.0):
+    """Cache GET responses of a view, protecting it from stampedes.
+
+    ``key_prefix`` is a string or a callable taking the view arguments.
+    Entries are fresh for ``timeout`` seconds and may be served stale for
+    ``stale_timeout`` more while a single worker holding the lock renders
+    the new copy. ``version``, a callable taking the view arguments,
+    marks what an entry was rendered from: an entry of another version
+    is stale the same way. Counters are kept under ``name``.
+    """
+    if stale_timeout is None:
+        stale_timeout = timeout
+
+    def decorator(view):
+        pages = PageCache(
+            timeout, key_prefix, version, name, stale_timeout,
+            lock_timeout, beta,
+        )
+        if asyncio.iscoroutinefunction(view):
+            return cache_async_view(view, pages)
+        return cache_view(view, pages)
+    return decorator
+
+
+def cache_view(view, pages):
+    """``cache_response`` of a plain view."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        key, version, action, entry = pages.lookup(request, args, kwargs)
+        if action == WAIT:
+            entry = pages.wait(key)
+        if entry is not None:
+            return pages.serve(request, version, entry)
+        started = time.monotonic()
+        try:
+            response = render_response(view(request, *args, **kwargs))
+        except BaseException:
+            if action == COMPUTE:
+                pages.release(key)
+            raise
+        pages.store(
+            request, key, version, response, started, action == COMPUTE
+        )
+        return response
+    return wrapper
+
+
+def cache_async_view(view, pages):
+    """``cache_response`` of a coroutine view; only cache calls block."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await view(request, *args, **kwargs)
+        key, version, action, entry = await aio.run(
+            pages.lookup, request, args, kwargs
+        )
+        if action == WAIT:
+            entry = await pages.await_page(key)
+        if entry is not None:
+            return pages.serve(request, version, entry)
+        started = time.monotonic()
+        try:
+            response = render_response(await view(request, *args, **kwargs))
+        except BaseException:
+            if action == COMPUTE:
+                await aio.run(pages.release, key)
+            raise
+        await aio.run(
+            pages.store, request, key, version, response, started,
+            action == COMPUTE,
+        )
+        return response
+    return wrapper
@@ -0,0 +1,70 @@
+"""Workers of the background task queue."""
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.tasks import Worker, get_option
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из таблицы core_task '
+        '(брокер core.tasks.DatabaseBroker).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Число процессов-воркеров.',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=get_option('WORKERS'),
+            help='Число потоков в каждом процессе.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза в секундах между опросами пустой очереди.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить задачи, которым пора, и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        if options['processes'] > 1 and not options['once']:
+            self.spawn(options)
+            return
+        worker = Worker(threads=options['threads'])
+        if options['once']:
+            worker.reclaim()
+            done = worker.run_pending()
+            self.stdout.write(self.style.SUCCESS(
+                f'Выполнено задач: {done}.'
+            ))
+            return
+        self.stdout.write(
+            f'Воркер {os.getpid()}: {options["threads"]} потоков.'
+        )
+        worker.run(interval=options['interval'])
+
+    def spawn(self, options):
+        command = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'),
+            'run_workers', '--processes', '1',
+            '--threads', str(options['threads']),
+            '--interval', str(options['interval']),
+        ]
+        processes = [
+            subprocess.Popen(command) for _ in range(options['processes'])
+        ]
+        try:
+            for process in processes:
+                process.wait()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait()
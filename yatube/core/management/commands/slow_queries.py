@@ -0,0 +1,89 @@
+"""Summarize the slow query log."""
+import json
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.slowlog import get_option
+
+SORT_KEYS = {
+    'total': lambda stats: stats['total_ms'],
+    'count': lambda stats: stats['count'],
+    'max': lambda stats: stats['max_ms'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Показывает самые тяжёлые запросы из журнала медленных запросов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=10,
+            help='Сколько отпечатков запросов показать.',
+        )
+        parser.add_argument(
+            '--sort', choices=tuple(SORT_KEYS), default='total',
+            help='Порядок: суммарное время, число или худшее время.',
+        )
+        parser.add_argument(
+            '--file', default=get_option('LOG_FILE'),
+            help='Журнал, по умолчанию SLOW_QUERIES["LOG_FILE"].',
+        )
+
+    def handle(self, *args, **options):
+        if not options['file']:
+            raise CommandError('Журнал медленных запросов не задан.')
+        try:
+            with open(options['file'], encoding='utf-8') as log:
+                stats = self.aggregate(log)
+        except FileNotFoundError:
+            raise CommandError(f'Нет журнала {options["file"]}.')
+        top = sorted(
+            stats.values(), key=SORT_KEYS[options['sort']], reverse=True
+        )[:options['top']]
+        for item in top:
+            self.stdout.write(self.style.SQL_KEYWORD(
+                f'{item["fingerprint"]}  {item["count"]} раз, '
+                f'всего {item["total_ms"]:.1f} мс, '
+                f'в среднем {item["total_ms"] / item["count"]:.1f} мс, '
+                f'худшее {item["max_ms"]:.1f} мс'
+            ))
+            self.stdout.write(f'  {item["sql"]}')
+            views = ', '.join(
+                f'{view} ({count})'
+                for view, count in item['views'].most_common(3)
+            )
+            self.stdout.write(f'  Страницы: {views}')
+            self.stdout.write(f'  Откуда: {item["frame"]}')
+            for line in item['plan'] or ():
+                self.stdout.write(f'  План: {line}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Отпечатков: {len(stats)}, показано: {len(top)}.'
+        ))
+
+    def aggregate(self, log):
+        stats = {}
+        for line in log:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            item = stats.setdefault(entry['fingerprint'], {
+                'fingerprint': entry['fingerprint'],
+                'sql': entry['sql'],
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'views': Counter(),
+                'frame': None,
+                'plan': None,
+            })
+            item['count'] += 1
+            item['total_ms'] += entry['duration_ms']
+            item['views'][entry.get('view') or '-'] += 1
+            if entry['duration_ms'] >= item['max_ms']:
+                # Место вызова и план - от самого медленного случая.
+                item['max_ms'] = entry['duration_ms']
+                item['frame'] = entry.get('frame')
+                item['plan'] = entry.get('plan') or item['plan']
+        return stats
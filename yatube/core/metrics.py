@@ -0,0 +1,99 @@
+"""Prometheus metrics of the site.
+
+The metrics live in the default ``prometheus_client`` registry. When the
+``PROMETHEUS_MULTIPROC_DIR`` environment variable names a directory
+(it must be set before the workers start), every worker process keeps
+its values in mmap'd files there and ``/metrics`` adds them up, so any
+worker can answer the scrape. A process manager should call
+``mark_process_dead`` for workers that exit.
+"""
+import hmac
+import os
+
+from django.conf import settings
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest, multiprocess
+)
+
+DEFAULTS = {
+    'ALLOWED_IPS': None,
+    'TOKEN': None,
+}
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0,
+    10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+REQUESTS = Counter(
+    'yatube_requests_total',
+    'Requests by URL name, method and status code.',
+    ['view', 'method', 'status'],
+)
+LATENCY = Histogram(
+    'yatube_request_duration_seconds',
+    'Response time by URL name.',
+    ['view'],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'yatube_request_db_queries',
+    'Database queries per request by URL name.',
+    ['view'],
+    buckets=QUERY_BUCKETS,
+)
+CACHE_EVENTS = Counter(
+    'yatube_cache_events_total',
+    'Page cache hits, misses, stale serves and lock waits.',
+    ['cache', 'event'],
+)
+THUMBNAIL_SECONDS = Histogram(
+    'yatube_thumbnail_generation_seconds',
+    'Time to render the thumbnails and variants of one post image.',
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def get_option(name):
+    return getattr(settings, 'METRICS', {}).get(name, DEFAULTS[name])
+
+
+def get_allowed_ips():
+    allowed = get_option('ALLOWED_IPS')
+    return settings.INTERNAL_IPS if allowed is None else allowed
+
+
+def is_allowed(request):
+    """Whether a request may read the metrics.
+
+    With a ``TOKEN`` the scraper must send it as a bearer token. Without
+    one the client address is checked, which only holds when nothing
+    proxies ``/metrics``: behind a proxy every request comes from it.
+    """
+    token = get_option('TOKEN')
+    if token:
+        expected = f'Bearer {token}'
+        # compare_digest takes only ASCII strings, any bytes.
+        return hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', '').encode(),
+            expected.encode(),
+        )
+    return request.META.get('REMOTE_ADDR') in get_allowed_ips()
+
+
+def collect():
+    """Text exposition of the metrics of every worker process."""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """Drop the live gauges of an exited worker (multiprocess mode)."""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid)
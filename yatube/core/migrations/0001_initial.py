@@ -0,0 +1,41 @@
+# Generated by Django 3.2 on 2026-10-18 03:15
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('name', models.CharField(max_length=200, verbose_name='Задача')),
+                ('args', models.JSONField(blank=True, default=list, verbose_name='Аргументы')),
+                ('kwargs', models.JSONField(blank=True, default=dict, verbose_name='Именованные аргументы')),
+                ('key', models.CharField(blank=True, max_length=200, null=True, unique=True, verbose_name='Ключ идемпотентности')),
+                ('status', models.CharField(choices=[('pending', 'Ждёт'), ('running', 'Выполняется'), ('done', 'Выполнена'), ('failed', 'Не удалась')], default='pending', max_length=10, verbose_name='Состояние')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Запустить после')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Занята воркером до')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершена')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+            ],
+            options={
+                'verbose_name': 'Задача',
+                'verbose_name_plural': 'Задачи',
+                'ordering': ['run_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'run_at'], name='task_status_run_at_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class CreatedModel(models.Model):
@@ -11,3 +12,50 @@ class CreatedModel(models.Model):
     class Meta:
         # Это абстрактная модель:
         abstract = True
+
+
+class Task(CreatedModel):
+    """Background task queued by ``core.tasks.DatabaseBroker``."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Ждёт'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не удалась'),
+    )
+
+    name = models.CharField('Задача', max_length=200)
+    args = models.JSONField('Аргументы', default=list, blank=True)
+    kwargs = models.JSONField('Именованные аргументы', default=dict,
+                              blank=True)
+    key = models.CharField(
+        'Ключ идемпотентности', max_length=200,
+        unique=True, null=True, blank=True,
+    )
+    status = models.CharField(
+        'Состояние', max_length=10, choices=STATUSES, default=PENDING
+    )
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    run_at = models.DateTimeField('Запустить после', default=timezone.now)
+    locked_until = models.DateTimeField(
+        'Занята воркером до', null=True, blank=True
+    )
+    finished = models.DateTimeField('Завершена', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        ordering = ['run_at']
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(
+                fields=('status', 'run_at'), name='task_status_run_at_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,162 @@
+"""Log of slow database queries.
+
+``install`` adds an execute wrapper to every database connection. Queries
+slower than ``THRESHOLD_MS`` are logged with their fingerprint (the SQL
+with literals and parameter lists collapsed), the URL name of the request
+and the project frame that issued them; a sampled share also gets the
+query plan. Records are written as JSON lines to ``LOG_FILE``, where
+``manage.py slow_queries`` aggregates them.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import traceback
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger('core.slowlog')
+
+DEFAULTS = {
+    'THRESHOLD_MS': 100,
+    'EXPLAIN_SAMPLE_RATE': 0.1,
+    'LOG_FILE': None,
+}
+
+_path = ContextVar('slowlog_path', default=None)
+_busy = ContextVar('slowlog_busy', default=False)
+_file_lock = threading.Lock()
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDERS_RE = re.compile(r'\((?:\s*\?\s*,)*\s*\?\s*\)')
+SPACE_RE = re.compile(r'\s+')
+# Кадры стека из этих мест не показывают, откуда пришёл запрос.
+SKIPPED_FRAMES = (os.sep + 'django' + os.sep, 'site-packages', __file__)
+
+
+def get_option(name):
+    return getattr(settings, 'SLOW_QUERIES', {}).get(name, DEFAULTS[name])
+
+
+def normalize(sql):
+    """SQL with literals and parameter lists replaced by placeholders."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = PLACEHOLDERS_RE.sub('(...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.md5(normalize(sql).encode()).hexdigest()[:12]
+
+
+def caller():
+    """The innermost project frame of the current stack."""
+    for frame in reversed(traceback.extract_stack()):
+        if not any(part in frame.filename for part in SKIPPED_FRAMES):
+            filename = os.path.relpath(frame.filename, settings.BASE_DIR)
+            return f'{filename}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def view_name():
+    path = _path.get()
+    if path is None:
+        return None
+    try:
+        return resolve(path).view_name
+    except Resolver404:
+        return 'unmatched'
+
+
+def explain(connection, sql, params):
+    prefix = (
+        'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+    )
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            return [' '.join(map(str, row)) for row in cursor.fetchall()]
+    except Exception:
+        logger.debug('Could not explain %s', sql, exc_info=True)
+        return None
+
+
+def record(entry):
+    line = json.dumps(entry, ensure_ascii=False)
+    logger.warning(line)
+    path = get_option('LOG_FILE')
+    if path:
+        with _file_lock, open(path, 'a', encoding='utf-8') as log:
+            log.write(line + '\n')
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    """Execute wrapper logging the queries above the threshold."""
+    if _busy.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - started) * 1000
+        if duration >= get_option('THRESHOLD_MS'):
+            token = _busy.set(True)
+            try:
+                report(sql, params, many, context, duration)
+            except Exception:
+                logger.exception('Could not log a slow query')
+            finally:
+                _busy.reset(token)
+
+
+def report(sql, params, many, context, duration):
+    entry = {
+        'fingerprint': fingerprint(sql),
+        'sql': normalize(sql),
+        'duration_ms': round(duration, 2),
+        'view': view_name(),
+        'frame': caller(),
+    }
+    is_select = sql.lstrip()[:6].upper() == 'SELECT'
+    sample_rate = get_option('EXPLAIN_SAMPLE_RATE')
+    if is_select and not many and random.random() < sample_rate:
+        entry['plan'] = explain(context['connection'], sql, params)
+    record(entry)
+
+
+def add_wrapper(sender, connection, **kwargs):
+    # The wrapper list outlives reconnects of the same connection.
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_queries)
+
+
+def remember_path(sender, environ=None, scope=None, **kwargs):
+    if environ is not None:
+        _path.set(environ.get('PATH_INFO'))
+    elif scope is not None:
+        _path.set(scope.get('path'))
+
+
+def forget_path(sender, **kwargs):
+    _path.set(None)
+
+
+def install():
+    """Log slow queries of every connection, opened now or later."""
+    connection_created.connect(add_wrapper)
+    for connection in connections.all():
+        add_wrapper(None, connection)
+    request_started.connect(remember_path)
+    request_finished.connect(forget_path)
@@ -0,0 +1,311 @@
+"""Background tasks.
+
+Side effects of writes are functions decorated with ``@task`` and queued
+with ``enqueue``; the broker set in ``TASKS['BROKER']`` decides where
+they run:
+
+* ``ImmediateBroker`` - at once, in the caller;
+* ``LocalBroker`` - after the commit, in a thread pool of the process
+  (an APScheduler background scheduler);
+* ``DatabaseBroker`` - rows of ``core.Task`` written in the caller's
+  transaction and run by ``manage.py run_workers``.
+
+A failing task is retried ``retries`` times, waiting ``BACKOFF **
+attempt`` seconds in between. A task queued with an idempotency ``key``
+is not queued again while a task with the same key is waiting or, for
+the database broker, has been done; a failed one is queued anew.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytz
+from apscheduler.jobstores.base import ConflictingIdError
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'BROKER': 'core.tasks.ImmediateBroker',
+    'WORKERS': 4,
+    'RETRIES': 3,
+    'BACKOFF': 2,
+    'LEASE': 300,
+    'KEEP_DONE': 7 * 24 * 60 * 60,
+}
+
+
+def get_option(name):
+    return getattr(settings, 'TASKS', {}).get(name, DEFAULTS[name])
+
+
+def get_broker():
+    """Return the configured broker."""
+    return import_string(get_option('BROKER'))()
+
+
+def task(retries=None):
+    """Register a function as a task that workers may run by name."""
+    def decorator(func):
+        func.task_name = f'{func.__module__}.{func.__name__}'
+        func.retries = get_option('RETRIES') if retries is None else retries
+        return func
+    return decorator
+
+
+def get_task(name):
+    """Return the task function registered under a dotted name."""
+    func = import_string(name)
+    if getattr(func, 'task_name', None) != name:
+        raise ValueError(f'{name} is not a task')
+    return func
+
+
+def enqueue(func, *args, key=None, delay=0, **kwargs):
+    """Queue a call of a task; arguments must be JSON-serializable."""
+    return get_broker().enqueue(
+        func.task_name, list(args), kwargs, key=key, delay=delay
+    )
+
+
+def get_backoff(attempt):
+    return get_option('BACKOFF') ** attempt
+
+
+class BaseBroker:
+    """Interface of a task broker."""
+
+    def enqueue(self, name, args, kwargs, key=None, delay=0):
+        """Queue a task; return False if its key is already queued."""
+        raise NotImplementedError
+
+
+class ImmediateBroker(BaseBroker):
+    """Run tasks on the spot; keys and delays are ignored."""
+
+    def enqueue(self, name, args, kwargs, key=None, delay=0):
+        func = get_task(name)
+        for attempt in range(func.retries + 1):
+            try:
+                func(*args, **kwargs)
+                return True
+            except Exception:
+                logger.exception(
+                    'Task %s failed, attempt %s', name, attempt + 1
+                )
+        return True
+
+
+class LocalBroker(BaseBroker):
+    """Run tasks in a background scheduler of this process.
+
+    Tasks are lost if the process exits before running them. A task is
+    scheduled once the transaction commits, so ``enqueue`` only reports
+    the keys scheduled by then; of two calls with one key in the same
+    transaction both return True, and the second is dropped at commit.
+    """
+
+    _scheduler = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_scheduler(cls):
+        with cls._lock:
+            if cls._scheduler is None:
+                cls._scheduler = BackgroundScheduler(
+                    timezone=pytz.utc,
+                    executors={'default': {
+                        'type': 'threadpool',
+                        'max_workers': get_option('WORKERS'),
+                    }},
+                    job_defaults={'misfire_grace_time': None},
+                )
+                cls._scheduler.start()
+            return cls._scheduler
+
+    def enqueue(self, name, args, kwargs, key=None, delay=0):
+        get_task(name)
+        if key is not None and self.get_scheduler().get_job(key):
+            return False
+        transaction.on_commit(
+            lambda: self.schedule(name, args, kwargs, key, delay, 0)
+        )
+        return True
+
+    def schedule(self, name, args, kwargs, key, delay, attempt):
+        try:
+            self.get_scheduler().add_job(
+                self.run, 'date',
+                run_date=timezone.now() + timedelta(seconds=delay),
+                args=(name, args, kwargs, key, attempt),
+                id=key,
+            )
+        except ConflictingIdError:
+            return False
+        return True
+
+    def run(self, name, args, kwargs, key, attempt):
+        func = get_task(name)
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            logger.exception('Task %s failed, attempt %s', name, attempt + 1)
+            if attempt < func.retries:
+                # Retries go without the key: the job may still hold it.
+                self.schedule(
+                    name, args, kwargs, None, get_backoff(attempt + 1),
+                    attempt + 1,
+                )
+        finally:
+            close_old_connections()
+
+
+class DatabaseBroker(BaseBroker):
+    """Keep tasks in ``core.Task`` for ``manage.py run_workers``.
+
+    The row is written in the caller's transaction, so a task is only
+    seen by workers once the write that queued it is committed.
+    """
+
+    def enqueue(self, name, args, kwargs, key=None, delay=0):
+        get_task(name)
+        run_at = timezone.now() + timedelta(seconds=delay)
+        try:
+            with transaction.atomic():
+                Task.objects.create(
+                    name=name, args=args, kwargs=kwargs, key=key,
+                    run_at=run_at,
+                )
+        except IntegrityError:
+            # A task that gave up doesn't hold its key forever.
+            return bool(Task.objects.filter(
+                key=key, status=Task.FAILED
+            ).update(
+                name=name, args=args, kwargs=kwargs, run_at=run_at,
+                status=Task.PENDING, attempts=0, last_error='',
+                locked_until=None, finished=None,
+            ))
+        return True
+
+
+class Worker:
+    """Run tasks of ``DatabaseBroker`` in a pool of threads.
+
+    Tasks are claimed with a conditional UPDATE, so any number of worker
+    processes can share the table. A claim is a lease: the task of a
+    worker that died is queued again when the lease runs out.
+    """
+
+    def __init__(self, threads=None, batch_size=100):
+        self.threads = threads or get_option('WORKERS')
+        self.batch_size = batch_size
+
+    def claim(self):
+        """Take due tasks for this worker."""
+        now = timezone.now()
+        ids = Task.objects.filter(
+            status=Task.PENDING, run_at__lte=now
+        ).order_by('run_at').values_list('pk', flat=True)[:self.batch_size]
+        claimed = []
+        for pk in ids:
+            if Task.objects.filter(pk=pk, status=Task.PENDING).update(
+                status=Task.RUNNING,
+                attempts=F('attempts') + 1,
+                locked_until=now + timedelta(seconds=get_option('LEASE')),
+            ):
+                claimed.append(pk)
+        return list(Task.objects.filter(pk__in=claimed).order_by('run_at'))
+
+    def execute(self, item):
+        """Run a claimed task and record the outcome."""
+        try:
+            func = get_task(item.name)
+        except (ImportError, ValueError) as error:
+            return self.fail(item, error, retry=False)
+        try:
+            func(*item.args, **item.kwargs)
+        except Exception as error:
+            logger.exception('Task %s failed, attempt %s', item, item.attempts)
+            return self.fail(item, error, retry=item.attempts <= func.retries)
+        finally:
+            close_old_connections()
+        Task.objects.filter(pk=item.pk).update(
+            status=Task.DONE, finished=timezone.now(), locked_until=None
+        )
+        return True
+
+    def fail(self, item, error, retry):
+        """Put a failed task back in the queue or give it up."""
+        changes = {'last_error': repr(error), 'locked_until': None}
+        if retry:
+            changes['status'] = Task.PENDING
+            changes['run_at'] = timezone.now() + timedelta(
+                seconds=get_backoff(item.attempts)
+            )
+        else:
+            changes['status'] = Task.FAILED
+            changes['finished'] = timezone.now()
+        Task.objects.filter(pk=item.pk).update(**changes)
+        return False
+
+    def run_pending(self, pool=None):
+        """Run due tasks until there are none; return how many ran."""
+        done = 0
+        try:
+            while True:
+                items = self.claim()
+                if not items:
+                    return done
+                if pool is None:
+                    list(map(self.execute, items))
+                else:
+                    list(pool.map(self.execute, items))
+                done += len(items)
+        finally:
+            close_old_connections()
+
+    def reclaim(self):
+        """Queue again the tasks whose lease has run out."""
+        return Task.objects.filter(
+            status=Task.RUNNING, locked_until__lt=timezone.now()
+        ).update(status=Task.PENDING, locked_until=None)
+
+    def purge(self):
+        """Delete tasks done longer than ``KEEP_DONE`` seconds ago."""
+        deadline = timezone.now() - timedelta(
+            seconds=get_option('KEEP_DONE')
+        )
+        return Task.objects.filter(
+            status=Task.DONE, finished__lt=deadline
+        ).delete()[0]
+
+    def run(self, interval=1.0):
+        """Poll the queue until the process is stopped."""
+        scheduler = BlockingScheduler(timezone=pytz.utc)
+        with ThreadPoolExecutor(self.threads) as pool:
+            scheduler.add_job(
+                self.run_pending, 'interval', seconds=interval,
+                args=(pool,), max_instances=1, coalesce=True,
+                next_run_time=timezone.now(),
+            )
+            scheduler.add_job(
+                self.reclaim, 'interval', seconds=get_option('LEASE'),
+                max_instances=1, coalesce=True,
+            )
+            scheduler.add_job(
+                self.purge, 'interval', hours=1,
+                max_instances=1, coalesce=True,
+            )
+            try:
+                scheduler.start()
+            except (KeyboardInterrupt, SystemExit):
+                pass
@@ -0,0 +1,150 @@
+"""Per-request performance counters.
+
+A sampled request gets a ``RequestTiming`` that collects database query
+count and time, cache hits and misses and template render time while the
+request is served; ``core.middleware.ServerTimingMiddleware`` reports it.
+Unsampled requests pay nothing but one random draw.
+
+Queries are seen by one execute wrapper on every connection (see
+``install``), which reports them to the observers of the current
+context. Context variables follow a request into the threads that
+``sync_to_async`` runs its ORM calls in, so queries of async views are
+counted like those of sync ones.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.base import Template
+
+DEFAULTS = {
+    'SAMPLE_RATE': 1.0,
+    'HEADER': False,
+    'LOG': True,
+}
+
+_current = ContextVar('request_timing', default=None)
+_observers = ContextVar('query_observers', default=())
+
+
+def get_option(name):
+    return getattr(settings, 'SERVER_TIMING', {}).get(name, DEFAULTS[name])
+
+
+class RequestTiming:
+    """Counters and durations, in seconds, of one request.
+
+    Async views add to it from several threads at once.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = Counter()
+        self.counts = Counter()
+        self.template_depth = 0
+        self.lock = threading.Lock()
+
+    def add(self, name, duration=None, count=1):
+        with self.lock:
+            if duration is not None:
+                self.durations[name] += duration
+            self.counts[name] += count
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def query(self, duration):
+        """Query observer adding up the database time."""
+        self.add('db', duration)
+
+
+def current():
+    """Timing of the request being served, None if it is not sampled."""
+    return _current.get()
+
+
+def count(name):
+    """Count an event, e.g. a cache hit, of the current request."""
+    timing = _current.get()
+    if timing is not None:
+        timing.add(name)
+
+
+def observe_queries(execute, sql, params, many, context):
+    """Execute wrapper passing query durations to the observers."""
+    observers = _observers.get()
+    if not observers:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        for observer in observers:
+            observer(duration)
+
+
+@contextmanager
+def observe(observer):
+    """Call ``observer(duration)`` for every query of the block."""
+    token = _observers.set((*_observers.get(), observer))
+    try:
+        yield
+    finally:
+        _observers.reset(token)
+
+
+@contextmanager
+def track():
+    """Collect the timing of the code in the block."""
+    timing = RequestTiming()
+    token = _current.set(timing)
+    try:
+        with observe(timing.query):
+            yield timing
+    finally:
+        _current.reset(token)
+
+
+def add_wrapper(sender, connection, **kwargs):
+    # The wrapper list outlives reconnects of the same connection.
+    if observe_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(observe_queries)
+
+
+def install():
+    """Observe queries of every connection, opened now or later."""
+    connection_created.connect(add_wrapper)
+    for connection in connections.all():
+        add_wrapper(None, connection)
+
+
+def instrument_templates():
+    """Time the outermost template render of sampled requests.
+
+    Included templates are rendered from inside their parent, so only
+    the outermost render is added up.
+    """
+    if getattr(Template.render, 'timed', False):
+        return
+    render = Template.render
+
+    def timed_render(self, context):
+        timing = _current.get()
+        if timing is None or timing.template_depth:
+            return render(self, context)
+        timing.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            timing.template_depth -= 1
+            timing.add('template', time.perf_counter() - started)
+
+    timed_render.timed = True
+    Template.render = timed_render
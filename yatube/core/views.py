@@ -1,5 +1,8 @@
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from core import metrics
+
 
 def page_not_found(request, exception):
     '''Выдать ошибку 404 в шаблон.'''
@@ -16,3 +19,11 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def metrics_view(request):
+    """Prometheus metrics of all workers, for the allowed addresses."""
+    if not metrics.is_allowed(request):
+        return HttpResponse(status=403)
+    body, content_type = metrics.collect()
+    return HttpResponse(body, content_type=content_type)
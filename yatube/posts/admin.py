@@ -3,6 +3,8 @@
 from django.contrib import admin
 
 from .models import Group, Post
+from .paginators import EstimatedCountPaginator
+from .search import get_search
 
 
 @admin.register(Post)
@@ -14,6 +16,14 @@ class PostAdmin(admin.ModelAdmin):
     list_editable = ('group',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search the full-text index instead of LIKE over every text."""
+        if not search_term:
+            return queryset, False
+        return get_search().filter(queryset, search_term), False
 
 
 admin.site.register(Group)
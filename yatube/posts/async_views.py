@@ -0,0 +1,118 @@
+"""Async versions of the read-only views.
+
+They are served under ASGI (see ``POSTS_ASYNC_VIEWS``). Queries that
+don't depend on each other, like the author, the follow status and the
+page of a profile, are made at once with ``core.aio.gather``; the
+page is fetched before rendering, so the template runs no queries of
+its own but the ones of the context processors.
+"""
+from core import aio
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, render
+
+from posts.caching import cache_feed
+from posts.conditional import conditional, feed_state, post_state
+from posts.forms import CommentForm
+from posts.models import Comment, Follow, Group, Post, UserStats
+from posts.views import (
+    get_page_context, group_scope, index_scope, profile_scope
+)
+from . serializers import PostSerializer
+
+User = get_user_model()
+
+
+def fetch_page_context(queryset, request, feed=None, count_hint=None):
+    """``get_page_context`` with the posts of the page already loaded."""
+    context = get_page_context(queryset, request, feed, count_hint)
+    page_obj = context['page_obj']
+    page_obj.object_list = list(page_obj.object_list)
+    return context
+
+
+@conditional(feed_state(index_scope))
+@cache_feed(index_scope)
+async def index(request):
+    context = await aio.run(
+        fetch_page_context,
+        Post.objects.select_related('author', 'group'), request, 'index',
+    )
+    return await aio.run(render, request, 'posts/index.html', context)
+
+
+@conditional(feed_state(group_scope))
+@cache_feed(group_scope)
+async def group_posts(request, slug):
+    """Prepare data for the group-list page."""
+    group, context = await aio.gather(
+        lambda: get_object_or_404(Group, slug=slug),
+        lambda: fetch_page_context(
+            Post.objects.filter(group__slug=slug).select_related(
+                'author', 'group'
+            ),
+            request, 'group_list',
+            count_hint=lambda: Group.objects.filter(slug=slug).values_list(
+                'posts_count', flat=True
+            ).first(),
+        ),
+    )
+    context['group'] = group
+    return await aio.run(render, request, 'posts/group_list.html', context)
+
+
+@conditional(feed_state(profile_scope))
+@cache_feed(profile_scope)
+async def profile(request, username):
+    """Prepare data for the user profile page."""
+    author, following, context = await aio.gather(
+        lambda: get_object_or_404(
+            User.objects.select_related('stats'), username=username
+        ),
+        lambda: Follow.objects.filter(
+            author__username=username, user_id=request.user.id
+        ).exists(),
+        lambda: fetch_page_context(
+            Post.objects.filter(
+                author__username=username
+            ).select_related('author', 'group'),
+            request, 'profile',
+            count_hint=lambda: UserStats.objects.filter(
+                user__username=username
+            ).values_list('posts_count', flat=True).first(),
+        ),
+    )
+    context.update({
+        'author': author,
+        'following': following,
+    })
+    return await aio.run(render, request, 'posts/profile.html', context)
+
+
+@conditional(lambda request, post_id: post_state(
+    Post.objects, post_id, 'comments_count', 'author__stats__posts_count'
+))
+async def post_detail(request, post_id):
+    """Prepare data for the post details page."""
+    post, comments = await aio.gather(
+        lambda: get_object_or_404(
+            Post.objects.select_related('author__stats', 'group'),
+            pk=post_id,
+        ),
+        lambda: list(
+            Comment.objects.filter(post_id=post_id).select_related('author')
+        ),
+    )
+    context = {
+        'post': post,
+        'comments': comments,
+        'form': CommentForm(request.POST or None),
+    }
+    return await aio.run(render, request, 'posts/post_detail.html', context)
+
+
+@conditional(lambda request, pk: post_state(Post.objects, pk))
+async def get_post(request, pk):
+    if request.method == 'GET':
+        post = await aio.run(get_object_or_404, Post, id=pk)
+        return JsonResponse(PostSerializer(post).data)
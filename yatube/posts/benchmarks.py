@@ -0,0 +1,177 @@
+"""Benchmarks of the main views.
+
+Each view is requested through the Django test client a number of
+times; the median and 95th percentile latency, the query count and the
+response size are compared with a stored baseline, so a change that
+makes a view much slower or adds queries is flagged.
+"""
+import json
+import math
+import platform
+import sqlite3
+import statistics
+import time
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+# Во сколько раз можно замедлиться относительно базовой линии.
+DEFAULT_THRESHOLD = 2.0
+
+
+def percentile(values, share):
+    """Nearest-rank percentile, ``share`` between 0 and 1."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def pick_targets():
+    """The heaviest rows of the dataset for every view."""
+    author = User.objects.order_by('-stats__posts_count', 'pk').first()
+    reader = User.objects.annotate(
+        follows=Count('follower')
+    ).order_by('-follows', 'pk').first()
+    if not Follow.objects.filter(user=reader).exists():
+        reader = author
+    return {
+        'author': author,
+        'reader': reader,
+        'group': Group.objects.order_by('-posts_count', 'pk').first(),
+        'post': Post.objects.order_by('-comments_count', 'pk').first(),
+    }
+
+
+def get_cases(targets):
+    """Name, login, method, URL and form data of every benchmark."""
+    author, reader = targets['author'], targets['reader']
+    post, group = targets['post'], targets['group']
+    cases = [
+        ('index', None, 'get', reverse('posts:index'), None),
+        ('profile', None, 'get',
+         reverse('posts:profile', args=[author.username]), None),
+        ('post_detail', None, 'get',
+         reverse('posts:post_detail', args=[post.pk]), None),
+        ('follow_index', reader, 'get', reverse('posts:follow_index'), None),
+        ('get_post', None, 'get',
+         reverse('posts:get_post', args=[post.pk]), None),
+        ('post_create', author, 'post', reverse('posts:post_create'),
+         {'text': 'Пост из бенчмарка'}),
+        ('add_comment', reader, 'post',
+         reverse('posts:add_comment', args=[post.pk]),
+         {'text': 'Комментарий из бенчмарка'}),
+    ]
+    if group is not None:
+        cases.insert(1, (
+            'group_posts', None, 'get',
+            reverse('posts:group_list', args=[group.slug]), None,
+        ))
+    return cases
+
+
+class QueryCounter:
+    """Execute wrapper counting queries without the debug cursor."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(client, method, url, data, runs, cold):
+    """Request a URL ``runs`` times; writes are rolled back."""
+    timings = []
+    queries = []
+    for _ in range(runs):
+        if cold:
+            cache.clear()
+        counter = QueryCounter()
+        with transaction.atomic(), connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            if method == 'get':
+                response = client.get(url)
+            else:
+                response = client.post(url, data)
+            timings.append((time.perf_counter() - started) * 1000)
+            transaction.set_rollback(True)
+        queries.append(counter.count)
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'queries': max(queries),
+        'bytes': len(response.content),
+        'status': response.status_code,
+    }
+
+
+def run(runs=20, warmup=3, cold=True, only=None):
+    """Benchmark every view and return the results."""
+    results = {}
+    for name, user, method, url, data in get_cases(pick_targets()):
+        if only and name not in only:
+            continue
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        if warmup:
+            measure(client, method, url, data, warmup, cold)
+        results[name] = measure(client, method, url, data, runs, cold)
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'runs': runs,
+            'cache': 'cold' if cold else 'warm',
+            'posts': Post.objects.count(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+        },
+        'views': results,
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Regressions of the results against a baseline, as messages."""
+    regressions = []
+    for name, current in results['views'].items():
+        before = baseline['views'].get(name)
+        if before is None:
+            continue
+        for key in ('median_ms', 'p95_ms'):
+            if current[key] > before[key] * threshold:
+                regressions.append(
+                    f'{name}: {key} {current[key]:.1f} > '
+                    f'{threshold} x {before[key]:.1f}'
+                )
+        if current['queries'] > before['queries']:
+            regressions.append(
+                f'{name}: queries {current["queries"]} > {before["queries"]}'
+            )
+        if current['bytes'] > before['bytes'] * threshold:
+            regressions.append(
+                f'{name}: bytes {current["bytes"]} > '
+                f'{threshold} x {before["bytes"]}'
+            )
+    return regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save(results, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+        file.write('\n')
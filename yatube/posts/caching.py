@@ -0,0 +1,132 @@
+"""Versioned page cache for post feeds.
+
+Every feed belongs to a scope (``index``, ``group:<slug>``,
+``author:<username>``, ``follow:<user id>``). A cached page is stamped
+with the current generation of its scope, and writes to the models
+drop the generations of the scopes they touch, so pages stay cached
+until their data actually changes. The key of a page doesn't include
+the generation: until one worker renders the new page, the others are
+served the previous one (see ``core.cache``).
+
+A follow feed also depends on the ``author:`` scopes of the followed
+authors, so a new post costs one invalidation however many followers
+its author has.
+
+Generations only work across processes with a shared cache backend.
+With a process-local one the invalidations made by other workers, task
+runners and commands never reach the process serving the page, so its
+pages are kept for ``POSTS_FEED_LOCAL_CACHE_TIMEOUT`` seconds only.
+"""
+import hashlib
+from uuid import uuid4
+
+from core.cache import cache_response
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+GENERATION_KEY = 'feed-generation:{}'
+DEFAULT_TIMEOUT = 60 * 60 * 24
+DEFAULT_LOCAL_TIMEOUT = 30
+LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+User = get_user_model()
+
+
+def get_generation_key(scope):
+    # Slugs and usernames may hold characters a cache key can't.
+    return GENERATION_KEY.format(hashlib.md5(scope.encode()).hexdigest())
+
+
+def get_generations(scopes):
+    """Return the current generation tokens of the scopes."""
+    keys = [get_generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    missing = [key for key in keys if key not in generations]
+    for key in missing:
+        cache.add(key, uuid4().hex[:12], None)
+    if missing:
+        generations.update(cache.get_many(missing))
+    return [generations.get(key) for key in keys]
+
+
+def get_generation(scope):
+    """Return the current generation token of a scope."""
+    return get_generations([scope])[0]
+
+
+def get_version(scopes):
+    """One token for the scopes and their current generations."""
+    parts = zip(scopes, get_generations(scopes))
+    return hashlib.md5(repr(list(parts)).encode()).hexdigest()
+
+
+def follow_scopes(user_id):
+    """Scopes of a follow feed: its own and those of followed authors."""
+    authors = User.objects.filter(
+        following__user_id=user_id
+    ).order_by('pk').values_list('username', flat=True)
+    return (f'follow:{user_id}', *(f'author:{name}' for name in authors))
+
+
+def get_feed_scopes(request, scope, *args, **kwargs):
+    """Scope names of the feed a request asks for, found once."""
+    if not hasattr(request, 'feed_scopes'):
+        names = scope(request, *args, **kwargs)
+        if isinstance(names, str):
+            names = (names,)
+        request.feed_scopes = tuple(names)
+    return request.feed_scopes
+
+
+def get_feed_version(request, scope, *args, **kwargs):
+    """Version of the feed a request asks for, read once per request."""
+    if not hasattr(request, 'feed_version'):
+        request.feed_version = get_version(
+            get_feed_scopes(request, scope, *args, **kwargs)
+        )
+    return request.feed_version
+
+
+def is_shared_cache(alias='default'):
+    """Whether other processes see the writes to the cache."""
+    return settings.CACHES[alias]['BACKEND'] not in LOCAL_BACKENDS
+
+
+def get_feed_timeout():
+    """How long a feed page is kept in the cache."""
+    timeout = getattr(settings, 'POSTS_FEED_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+    if is_shared_cache():
+        return timeout
+    return min(timeout, getattr(
+        settings, 'POSTS_FEED_LOCAL_CACHE_TIMEOUT', DEFAULT_LOCAL_TIMEOUT
+    ))
+
+
+def invalidate(*scopes):
+    """Start new generations of the scopes, evicting their pages."""
+    cache.delete_many([get_generation_key(scope) for scope in scopes])
+
+
+def cache_feed(scope):
+    """Cache a feed page until one of its scopes is invalidated.
+
+    ``scope`` is called with the view arguments and returns the scope
+    name of the page or a tuple of the names it depends on.
+    """
+    def key_prefix(request, *args, **kwargs):
+        name = get_feed_scopes(request, scope, *args, **kwargs)[0]
+        return hashlib.md5(name.encode()).hexdigest()
+
+    def version(request, *args, **kwargs):
+        return get_feed_version(request, scope, *args, **kwargs)
+
+    return cache_response(
+        get_feed_timeout(),
+        key_prefix=key_prefix,
+        version=version,
+        name='feed',
+    )
@@ -0,0 +1,105 @@
+"""Conditional GET for feeds and posts.
+
+A client polling an unchanged page is answered ``304 Not Modified``
+before the page cache is consulted or a template is rendered. Feeds are
+validated by the generations of their cache scopes (see
+``posts.caching``), read from the cache without touching the tables;
+a post by its own row, looked up by primary key. A page cache serving
+an older copy of a feed marks the request, and the copy goes out
+without validators, so it isn't mistaken for the current page later.
+"""
+import asyncio
+import hashlib
+from calendar import timegm
+from functools import wraps
+
+from core import aio
+from core.cache import STALE_VERSION_ATTR
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from posts.caching import get_feed_version
+
+STATE_ATTR = '_conditional_state'
+
+
+def make_etag(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def set_validators(request, response, etag, last_modified):
+    """Add ETag and Last-Modified to a response of a safe method."""
+    if hasattr(request, STALE_VERSION_ATTR):
+        return response
+    if request.method in ('GET', 'HEAD'):
+        if last_modified and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(last_modified)
+        if etag:
+            response.headers.setdefault('ETag', etag)
+    return response
+
+
+def conditional(state):
+    """Emit ETag and Last-Modified of a view and answer 304 when fresh.
+
+    ``state`` is called with the view arguments and returns the ETag
+    parts and the Last-Modified time of the page data, or ``None`` when
+    there is no such data. Pages differ between readers, so the reader
+    is always a part of the ETag. Works like ``condition`` and also
+    wraps async views, computing the state in the request's thread.
+    """
+    def get_validators(request, *args, **kwargs):
+        if not hasattr(request, STATE_ATTR):
+            setattr(request, STATE_ATTR, state(request, *args, **kwargs))
+        current = getattr(request, STATE_ATTR)
+        if current is None:
+            return None, None
+        parts, modified = current
+        etag = quote_etag(make_etag(request.user.pk, *parts))
+        return etag, modified and timegm(modified.utctimetuple())
+
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def async_inner(request, *args, **kwargs):
+                etag, last_modified = await aio.run(
+                    get_validators, request, *args, **kwargs
+                )
+                response = get_conditional_response(
+                    request, etag=etag, last_modified=last_modified
+                )
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return set_validators(request, response, etag, last_modified)
+            return async_inner
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            etag, last_modified = get_validators(request, *args, **kwargs)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return set_validators(request, response, etag, last_modified)
+        return inner
+    return decorator
+
+
+def feed_state(scope):
+    """State of a feed cached with ``cache_feed(scope)``.
+
+    Every write to the feed starts a new generation of one of its
+    scopes, so the version of the scopes changes with the page.
+    """
+    def state(request, *args, **kwargs):
+        return (get_feed_version(request, scope, *args, **kwargs),), None
+    return state
+
+
+def post_state(posts, pk, *fields):
+    """Modification state of one post and the given related fields."""
+    row = posts.filter(pk=pk).values_list('updated', *fields).first()
+    if row is None:
+        return None
+    return row, row[0]
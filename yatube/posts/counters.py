@@ -0,0 +1,70 @@
+"""Denormalized counters of posts, comments and follows.
+
+Counters are changed with ``F()`` expressions, so concurrent writes
+never lose an update; ``recount`` repairs any drift from the source
+tables.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Comment, Follow, Group, Post, UserStats
+
+# Модель счётчика, поле, считаемая модель и её ссылка на строку счётчика.
+COUNTERS = (
+    (Group, 'posts_count', Post, 'group'),
+    (Post, 'comments_count', Comment, 'post'),
+    (UserStats, 'posts_count', Post, 'author'),
+    (UserStats, 'followers_count', Follow, 'author'),
+    (UserStats, 'following_count', Follow, 'user'),
+)
+
+
+def change(model, pk, **deltas):
+    """Add deltas to the counters of one row.
+
+    A counter that would go below zero is left for ``recount``.
+    """
+    floors = {
+        f'{field}__gte': -delta
+        for field, delta in deltas.items() if delta < 0
+    }
+    return model.objects.filter(pk=pk, **floors).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def change_user(user_id, **deltas):
+    """Add deltas to the counters of a user, creating the row if needed."""
+    if change(UserStats, user_id, **deltas):
+        return
+    try:
+        with transaction.atomic():
+            UserStats.objects.create(user_id=user_id)
+    except IntegrityError:
+        pass
+    change(UserStats, user_id, **deltas)
+
+
+def recount(model, field, counted, link, batch_size=1000):
+    """Recompute one counter column in primary key batches."""
+    fresh = Coalesce(Subquery(
+        counted.objects.filter(**{link: OuterRef('pk')})
+        .order_by()
+        .values(link)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+    rows = model.objects.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+    updated = 0
+    while True:
+        batch = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+        pks = list(batch[:batch_size])
+        if not pks:
+            return updated
+        with transaction.atomic():
+            updated += model.objects.filter(pk__in=pks).exclude(
+                **{field: fresh}
+            ).update(**{field: fresh})
+        last_pk = pks[-1]
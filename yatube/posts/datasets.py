@@ -0,0 +1,237 @@
+"""Reproducible synthetic data for load tests.
+
+``Dataset`` writes users, groups, posts, comments and follows with
+``bulk_create`` and explicit primary keys, so nothing is read back while
+generating. Every choice is drawn from one seeded ``random.Random`` and
+dates are counted from a fixed start, so the same seed and sizes always
+give the same rows. Authors and followed users are picked with Zipf
+weights: a few accounts write and are followed a lot, most barely at all.
+"""
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Max
+from PIL import Image, ImageDraw
+
+from posts.imports import keep_dates
+from posts.models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+# Размеры наборов: посты, пользователи, группы, комментарии и среднее
+# число подписок на пользователя.
+PRESETS = {
+    '10k': dict(posts=10_000, users=500, groups=10, comments=20_000),
+    '100k': dict(posts=100_000, users=5_000, groups=50, comments=200_000),
+    '1m': dict(posts=1_000_000, users=50_000, groups=200, comments=2_000_000),
+    '10m': dict(
+        posts=10_000_000, users=500_000, groups=1_000, comments=20_000_000
+    ),
+}
+FOLLOWS_PER_USER = 20
+ZIPF_EXPONENT = 1.1
+START = datetime(2022, 1, 1, tzinfo=dt_timezone.utc)
+SPAN = timedelta(days=365)
+PASSWORD = 'password'
+WORDS = (
+    'тигр ягнёнок лес ночь огонь звезда река город утро дорога песня '
+    'ветер море книга дом свет тень сад зима лето tiger lamb forest '
+    'night fire star river city morning road song wind sea book home '
+    'light shadow garden winter summer'
+).split()
+IMAGE_SIZE = (960, 540)
+
+
+class Dataset:
+    """Generator of one dataset; methods yield their progress."""
+
+    def __init__(self, posts, users, groups, comments,
+                 follows_per_user=FOLLOWS_PER_USER, images=0,
+                 image_share=0.1, seed=0, batch_size=5000):
+        self.sizes = {
+            'users': users, 'groups': groups, 'posts': posts,
+            'comments': comments,
+        }
+        self.follows_per_user = follows_per_user
+        self.images = images
+        self.image_share = image_share
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        # Rows are added after the existing ones, keys are not read back.
+        self.first = {
+            model: (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+            for model in (User, Group, Post, Comment, Follow)
+        }
+        weights = [
+            1 / rank ** ZIPF_EXPONENT for rank in range(1, users + 1)
+        ]
+        self.popularity = list(accumulate(weights))
+        self.user_ids = range(self.first[User], self.first[User] + users)
+
+    def pick_users(self, count):
+        """User ids, popular users more often."""
+        return self.random.choices(
+            self.user_ids, cum_weights=self.popularity, k=count
+        )
+
+    def pub_date(self, number):
+        """Posts are spread evenly over the span, oldest first."""
+        return START + SPAN * number / max(self.sizes['posts'], 1)
+
+    def text(self, low, high):
+        return ' '.join(
+            self.random.choices(WORDS, k=self.random.randint(low, high))
+        ).capitalize()
+
+    def write(self, model, rows):
+        with transaction.atomic(), keep_dates(model):
+            model.objects.bulk_create(rows, batch_size=self.batch_size)
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield start, min(start + self.batch_size, total)
+
+    def generate(self):
+        """Write every table, yielding ``(table, rows written)``."""
+        yield from self.generate_users()
+        yield from self.generate_groups()
+        yield from self.generate_posts()
+        yield from self.generate_comments()
+        yield from self.generate_follows()
+
+    def generate_users(self):
+        password = make_password(PASSWORD)
+        for start, end in self.batches(self.sizes['users']):
+            users = [
+                User(
+                    pk=self.first[User] + number,
+                    username=f'user{self.first[User] + number}',
+                    password=password,
+                    date_joined=START,
+                )
+                for number in range(start, end)
+            ]
+            self.write(User, users)
+            UserStats.objects.bulk_create(
+                [UserStats(user_id=user.pk) for user in users],
+                ignore_conflicts=True,
+            )
+            yield 'users', end
+
+    def generate_groups(self):
+        groups = [
+            Group(
+                pk=self.first[Group] + number,
+                slug=f'group-{self.first[Group] + number}',
+                title=self.text(1, 3),
+                description=self.text(5, 20),
+            )
+            for number in range(self.sizes['groups'])
+        ]
+        self.write(Group, groups)
+        yield 'groups', len(groups)
+
+    def generate_images(self):
+        names = []
+        for number in range(self.images):
+            image = Image.new('RGB', IMAGE_SIZE, tuple(
+                self.random.randrange(256) for _ in range(3)
+            ))
+            draw = ImageDraw.Draw(image)
+            for _ in range(8):
+                box = sorted(self.random.sample(range(IMAGE_SIZE[0]), 2))
+                height = sorted(self.random.sample(range(IMAGE_SIZE[1]), 2))
+                draw.rectangle(
+                    (box[0], height[0], box[1], height[1]),
+                    fill=tuple(self.random.randrange(256) for _ in range(3)),
+                )
+            buffer = BytesIO()
+            image.save(buffer, 'JPEG', quality=80)
+            names.append(default_storage.save(
+                f'posts/dataset-{number}.jpg', ContentFile(buffer.getvalue())
+            ))
+        return names
+
+    def generate_posts(self):
+        images = self.generate_images()
+        groups = range(
+            self.first[Group], self.first[Group] + self.sizes['groups']
+        )
+        for start, end in self.batches(self.sizes['posts']):
+            authors = self.pick_users(end - start)
+            posts = []
+            for number, author_id in zip(range(start, end), authors):
+                pub_date = self.pub_date(number)
+                image = ''
+                if images and self.random.random() < self.image_share:
+                    image = self.random.choice(images)
+                posts.append(Post(
+                    pk=self.first[Post] + number,
+                    author_id=author_id,
+                    group_id=(
+                        self.random.choice(groups)
+                        if groups and self.random.random() < 0.7 else None
+                    ),
+                    text=self.text(5, 60),
+                    image=image,
+                    pub_date=pub_date,
+                    updated=pub_date,
+                    # Thumbnails are left to generate_thumbnails.
+                    thumbnails_ready=not image,
+                ))
+            self.write(Post, posts)
+            yield 'posts', end
+
+    def generate_comments(self):
+        posts = self.sizes['posts']
+        if not posts:
+            return
+        for start, end in self.batches(self.sizes['comments']):
+            comments = []
+            for number in range(start, end):
+                post = self.random.randrange(posts)
+                comments.append(Comment(
+                    pk=self.first[Comment] + number,
+                    post_id=self.first[Post] + post,
+                    author_id=self.pick_users(1)[0],
+                    text=self.text(3, 30),
+                    created=self.pub_date(post) + timedelta(
+                        minutes=self.random.expovariate(1 / 600)
+                    ),
+                ))
+            self.write(Comment, comments)
+            yield 'comments', end
+
+    def generate_follows(self):
+        """Power-law out-degrees, Zipf-distributed followed users."""
+        follows = []
+        written = 0
+        for user_id in self.user_ids:
+            degree = round(
+                (self.random.paretovariate(2.0) - 1) * self.follows_per_user
+            )
+            degree = min(degree, len(self.user_ids) - 1)
+            authors = set(self.pick_users(degree))
+            authors.discard(user_id)
+            for author_id in sorted(authors):
+                follows.append(Follow(
+                    pk=self.first[Follow] + written + len(follows),
+                    user_id=user_id,
+                    author_id=author_id,
+                ))
+            if len(follows) >= self.batch_size:
+                self.write(Follow, follows)
+                written += len(follows)
+                follows = []
+                yield 'follows', written
+        if follows:
+            self.write(Follow, follows)
+            written += len(follows)
+        yield 'follows', written
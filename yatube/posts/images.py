@@ -0,0 +1,100 @@
+"""Responsive variants of post images.
+
+Each uploaded image is cut to the feed aspect ratio and saved in several
+widths and modern formats; the metadata is kept in ``Post.image_variants``
+and rendered as ``<picture>``/``srcset`` by the ``picture`` template tag.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+DEFAULTS = {
+    'WIDTHS': [320, 640, 960],
+    'FORMATS': ['avif', 'webp'],
+    'ASPECT': (960, 339),
+    'QUALITY': 75,
+    'UPLOAD_TO': 'posts/variants/',
+}
+
+MIME_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+}
+
+
+def get_option(name):
+    return getattr(settings, 'POSTS_IMAGE_VARIANTS', {}).get(
+        name, DEFAULTS[name]
+    )
+
+
+def supported_formats():
+    """Configured formats this Pillow build can write."""
+    Image.init()
+    return [
+        image_format for image_format in get_option('FORMATS')
+        if image_format.upper() in Image.SAVE
+    ]
+
+
+def make_variants(post):
+    """Save every variant of a post image and return their metadata."""
+    aspect_width, aspect_height = get_option('ASPECT')
+    with post.image.open('rb') as image_file:
+        source = Image.open(image_file)
+        source.load()
+    source = ImageOps.exif_transpose(source)
+    if source.mode not in ('RGB', 'RGBA'):
+        source = source.convert('RGBA' if 'A' in source.getbands() else 'RGB')
+    # The smallest width is kept even for tiny uploads.
+    widths = sorted(get_option('WIDTHS'))
+    widths = [w for w in widths if w <= source.width] or widths[:1]
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    variants = []
+    for image_format in supported_formats():
+        for width in widths:
+            height = round(width * aspect_height / aspect_width)
+            resized = ImageOps.fit(
+                source, (width, height), Image.LANCZOS, centering=(0.5, 0.5)
+            )
+            buffer = BytesIO()
+            resized.save(
+                buffer, image_format.upper(), quality=get_option('QUALITY')
+            )
+            name = os.path.join(
+                get_option('UPLOAD_TO'),
+                str(post.pk),
+                f'{stem}-{width}.{image_format}',
+            )
+            default_storage.delete(name)
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+            variants.append({
+                'format': image_format,
+                'width': width,
+                'height': height,
+                'name': name,
+                'size': buffer.tell(),
+            })
+    return variants
+
+
+def group_variants(variants):
+    """Build ``<source>`` data: one srcset per format, best format first."""
+    sources = []
+    for image_format in get_option('FORMATS'):
+        items = [v for v in variants if v['format'] == image_format]
+        if not items:
+            continue
+        srcset = ', '.join(
+            f"{default_storage.url(v['name'])} {v['width']}w"
+            for v in sorted(items, key=lambda v: v['width'])
+        )
+        sources.append({
+            'type': MIME_TYPES.get(image_format, f'image/{image_format}'),
+            'srcset': srcset,
+        })
+    return sources
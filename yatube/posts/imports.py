@@ -0,0 +1,283 @@
+"""Bulk import of groups, posts, comments and follows.
+
+Rows are validated and written in chunks with ``bulk_create``; authors,
+groups and posts named by the rows are resolved through in-memory
+lookups filled with one query per chunk. ``bulk_create`` skips model
+signals, so the caller recounts counters and invalidates feeds after
+the import.
+"""
+import csv
+import gzip
+import io
+import json
+import sys
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+
+
+class RowError(ValueError):
+    """A row that cannot be imported."""
+
+
+class Lookup:
+    """In-memory map of natural keys of a model to primary keys."""
+
+    def __init__(self, model, field):
+        self.queryset = model.objects.all()
+        self.field = field
+        # CSV gives every value as a string.
+        self.to_python = (
+            model._meta.pk if field == 'pk' else model._meta.get_field(field)
+        ).to_python
+        self.keys = {}
+
+    def key(self, value):
+        try:
+            return self.to_python(value)
+        except ValidationError:
+            return None
+
+    def load(self, values):
+        """Resolve the values not seen yet with one query."""
+        missing = {self.key(value) for value in values if value is not None}
+        missing -= set(self.keys)
+        missing.discard(None)
+        if not missing:
+            return
+        # Misses are not remembered: the rows may be imported later.
+        self.keys.update(self.queryset.filter(
+            **{f'{self.field}__in': missing}
+        ).values_list(self.field, 'pk'))
+
+    def get(self, value):
+        return None if value is None else self.keys.get(self.key(value))
+
+
+@contextmanager
+def keep_dates(*models):
+    """Let ``bulk_create`` keep the dates given in the rows.
+
+    ``auto_now`` and ``auto_now_add`` would overwrite them on insert.
+    """
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def open_stream(path):
+    """Open a text stream, ``-`` for stdin, gunzipping ``.gz`` files."""
+    if path == '-':
+        return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_rows(stream, file_format, default_type):
+    """Yield line numbers and row dicts of an NDJSON or CSV stream."""
+    if file_format == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=2):
+            yield number, {
+                key: value if value != '' else None
+                for key, value in row.items()
+            }, default_type
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield number, RowError(f'invalid JSON: {error}'), None
+            continue
+        yield number, row, row.pop('type', default_type)
+
+
+def parse_date(value, default):
+    if value is None:
+        return default
+    moment = parse_datetime(value)
+    if moment is None:
+        raise RowError(f'invalid date: {value!r}')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Importer:
+    """Validate and write rows in chunks of ``batch_size``."""
+
+    TYPES = ('group', 'post', 'comment', 'follow')
+    # Связи проверяются по словарям, а не запросом на каждую строку.
+    RELATIONS = ('author', 'group', 'post', 'user')
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.users = Lookup(User, 'username')
+        self.user_ids = Lookup(User, 'pk')
+        self.groups = Lookup(Group, 'slug')
+        self.group_ids = Lookup(Group, 'pk')
+        self.post_ids = Lookup(Post, 'pk')
+        self.created = dict.fromkeys(self.TYPES, 0)
+        self.errors = []
+        self.author_ids = set()
+        self.touched_group_ids = set()
+        self.reader_ids = set()
+        self.now = timezone.now()
+
+    def run(self, rows):
+        """Import ``(line number, row, type)`` triples in order.
+
+        Rows of one type are buffered until the type changes, so groups
+        and posts are written before the rows that refer to them.
+        """
+        buffer = []
+        kind = None
+        for number, row, row_type in rows:
+            if isinstance(row, RowError):
+                self.errors.append((number, str(row)))
+                continue
+            if row_type == 'watermark':
+                continue
+            if row_type not in self.TYPES:
+                self.errors.append((number, f'unknown type: {row_type!r}'))
+                continue
+            full = len(buffer) >= self.batch_size
+            if buffer and (row_type != kind or full):
+                self.flush(kind, buffer)
+                yield self.created
+                buffer = []
+            kind = row_type
+            buffer.append((number, row))
+        if buffer:
+            self.flush(kind, buffer)
+            yield self.created
+
+    def flush(self, kind, rows):
+        self.resolve(rows)
+        build = getattr(self, f'build_{kind}')
+        objects = []
+        for number, row in rows:
+            try:
+                obj = build(row)
+                obj.clean_fields(exclude=self.RELATIONS)
+            except RowError as error:
+                self.errors.append((number, str(error)))
+                continue
+            except ValidationError as error:
+                self.errors.append((number, '; '.join(
+                    f'{field}: {" ".join(messages)}'
+                    for field, messages in error.message_dict.items()
+                )))
+                continue
+            objects.append(obj)
+        if not objects:
+            return
+        model = type(objects[0])
+        with transaction.atomic(), keep_dates(model):
+            model.objects.bulk_create(
+                objects, ignore_conflicts=model is Follow
+            )
+        self.created[kind] += len(objects)
+
+    def resolve(self, rows):
+        """Fill the lookups for every key the chunk refers to."""
+        self.users.load(
+            row.get(key) for _, row in rows for key in ('author', 'user')
+        )
+        self.user_ids.load(
+            row.get(key) for _, row in rows
+            for key in ('author_id', 'user_id')
+        )
+        self.groups.load(row.get('group') for _, row in rows)
+        self.group_ids.load(row.get('group_id') for _, row in rows)
+        self.post_ids.load(row.get('post_id') for _, row in rows)
+
+    def user(self, row, key):
+        if row.get(key) is not None:
+            pk = self.users.get(row[key])
+        else:
+            pk = self.user_ids.get(row.get(f'{key}_id'))
+        if pk is None:
+            raise RowError(f'unknown {key}')
+        return pk
+
+    def group(self, row):
+        if row.get('group') is not None:
+            pk = self.groups.get(row['group'])
+        elif row.get('group_id') is not None:
+            pk = self.group_ids.get(row['group_id'])
+        else:
+            return None
+        if pk is None:
+            raise RowError('unknown group')
+        return pk
+
+    def build_group(self, row):
+        return Group(
+            pk=row.get('id'),
+            slug=row.get('slug'),
+            title=row.get('title'),
+            description=row.get('description'),
+        )
+
+    def build_post(self, row):
+        pub_date = parse_date(row.get('pub_date'), self.now)
+        post = Post(
+            pk=row.get('id'),
+            author_id=self.user(row, 'author'),
+            group_id=self.group(row),
+            text=row.get('text'),
+            image=row.get('image') or '',
+            pub_date=pub_date,
+            updated=parse_date(row.get('updated'), pub_date),
+        )
+        # Thumbnails of imported images are left to generate_thumbnails.
+        post.thumbnails_ready = not post.image
+        self.author_ids.add(post.author_id)
+        self.touched_group_ids.add(post.group_id)
+        return post
+
+    def build_comment(self, row):
+        post_id = self.post_ids.get(row.get('post_id'))
+        if post_id is None:
+            raise RowError('unknown post')
+        return Comment(
+            pk=row.get('id'),
+            post_id=post_id,
+            author_id=self.user(row, 'author'),
+            text=row.get('text'),
+            created=parse_date(row.get('created'), self.now),
+        )
+
+    def build_follow(self, row):
+        follow = Follow(
+            user_id=self.user(row, 'user'),
+            author_id=self.user(row, 'author'),
+        )
+        if follow.user_id == follow.author_id:
+            raise RowError('cannot follow yourself')
+        self.author_ids.add(follow.author_id)
+        self.reader_ids.add(follow.user_id)
+        return follow
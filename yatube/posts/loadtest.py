@@ -0,0 +1,323 @@
+"""HTTP load generator.
+
+``LoadTest`` drives a live server with many concurrent clients, each a
+thread with its own keep-alive connection, running scenarios picked by
+weight: anonymous feed browsing, the follow feed of a logged-in reader,
+commenting and posting. Forms are loaded first, so writes go through
+CSRF like a browser's would. Latencies are kept per request kind.
+"""
+import http.client
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+)
+from django.contrib.sessions.backends.db import SessionStore
+from django.urls import reverse
+
+from posts.benchmarks import percentile
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+DEFAULT_MIX = {'browse': 70, 'follow': 20, 'comment': 7, 'post': 3}
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+TIMEOUT = 30
+STARTUP_TIMEOUT = 30
+
+
+def parse_mix(value):
+    """Parse ``browse=70,follow=20`` into scenario weights."""
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in DEFAULT_MIX:
+            raise ValueError(f'Unknown scenario: {name!r}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def login_session(user):
+    """Session key of a logged-in session, as if the user signed in."""
+    session = SessionStore()
+    session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return session.session_key
+
+
+def server_command(server, port, workers):
+    """Command line of a local server of the project.
+
+    Both interfaces run under uvicorn with the same number of worker
+    processes, so a comparison measures the interface, not the server.
+    """
+    if server == 'wsgi':
+        application = ['yatube.wsgi:application', '--interface', 'wsgi']
+    else:
+        application = ['yatube.asgi:application']
+    return [
+        sys.executable, '-m', 'uvicorn', *application,
+        '--host', '127.0.0.1', '--port', str(port),
+        '--workers', str(workers), '--log-level', 'warning',
+        '--no-access-log',
+    ]
+
+
+@contextmanager
+def serve(server='wsgi', port=8765, workers=1):
+    """Run the project on localhost for the duration of the block."""
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    # A file, not a pipe: the access log would fill a pipe and stall it.
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(
+        server_command(server, port, workers), cwd=settings.BASE_DIR,
+        env=env, stdout=subprocess.DEVNULL, stderr=log,
+    )
+    try:
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            if process.poll() is not None:
+                log.seek(0)
+                raise RuntimeError(
+                    'Server exited: ' + log.read().decode(errors='replace')
+                )
+            try:
+                socket.create_connection(('127.0.0.1', port), 1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError('Server did not start in time')
+                time.sleep(0.2)
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log.close()
+
+
+class Targets:
+    """URLs and accounts the scenarios pick from, read once."""
+
+    def __init__(self, readers=50):
+        self.pages = [reverse('posts:index')]
+        self.pages += [
+            reverse('posts:group_list', args=[slug])
+            for slug in Group.objects.values_list('slug', flat=True)[:20]
+        ]
+        self.pages += [
+            reverse('posts:profile', args=[username])
+            for username in User.objects.order_by(
+                '-stats__posts_count'
+            ).values_list('username', flat=True)[:20]
+        ]
+        self.post_ids = list(
+            Post.objects.order_by('-pub_date').values_list('pk', flat=True)
+            [:200]
+        )
+        users = User.objects.filter(
+            pk__in=Follow.objects.values('user_id')
+        ).order_by('pk')[:readers]
+        self.sessions = [login_session(user) for user in users]
+
+
+class Client:
+    """One simulated user with a keep-alive connection and cookies."""
+
+    def __init__(self, base_url, session=None):
+        parts = urlsplit(base_url)
+        self.connection = http.client.HTTPConnection(
+            parts.hostname, parts.port, timeout=TIMEOUT
+        )
+        self.cookies = {}
+        if session:
+            self.cookies['sessionid'] = session
+
+    def request(self, method, path, form=None):
+        headers = {}
+        body = None
+        if self.cookies:
+            headers['Cookie'] = '; '.join(
+                f'{key}={value}' for key, value in self.cookies.items()
+            )
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            raise
+        for header in response.headers.get_all('Set-Cookie') or ():
+            cookie = SimpleCookie(header)
+            for key, morsel in cookie.items():
+                self.cookies[key] = morsel.value
+        return response.status, content
+
+    def close(self):
+        self.connection.close()
+
+
+class LoadTest:
+    """Run a request mix against ``base_url`` with ``clients`` threads."""
+
+    def __init__(self, base_url, targets, clients=20, duration=10.0,
+                 mix=None, seed=0):
+        self.base_url = base_url
+        self.targets = targets
+        self.clients = clients
+        self.duration = duration
+        self.mix = mix or DEFAULT_MIX
+        self.seed = seed
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, kind, started, ok):
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies[kind].append(elapsed)
+            if not ok:
+                self.errors[kind] += 1
+
+    def call(self, client, kind, method, path, form=None, expect=(200,)):
+        started = time.perf_counter()
+        try:
+            status, content = client.request(method, path, form)
+        except (OSError, http.client.HTTPException):
+            self.record(kind, started, False)
+            return None
+        ok = status in expect
+        self.record(kind, started, ok)
+        return content if ok else None
+
+    def csrf_token(self, kind, page):
+        """Token of the form on a loaded page; a page without one fails."""
+        if page is None:
+            return None
+        match = CSRF_RE.search(page.decode())
+        if match is None:
+            self.record(kind, time.perf_counter(), False)
+            return None
+        return match.group(1)
+
+    def browse(self, client, rng):
+        self.call(client, 'browse', 'GET', rng.choice(self.targets.pages))
+        if self.targets.post_ids:
+            post_id = rng.choice(self.targets.post_ids)
+            self.call(
+                client, 'browse', 'GET',
+                reverse('posts:post_detail', args=[post_id]),
+            )
+
+    def follow(self, client, rng):
+        self.call(client, 'follow', 'GET', reverse('posts:follow_index'))
+
+    def comment(self, client, rng):
+        if not self.targets.post_ids:
+            return
+        post_id = rng.choice(self.targets.post_ids)
+        page = self.call(
+            client, 'comment', 'GET',
+            reverse('posts:post_detail', args=[post_id]),
+        )
+        token = self.csrf_token('comment', page)
+        if token is None:
+            return
+        self.call(
+            client, 'comment', 'POST',
+            reverse('posts:add_comment', args=[post_id]),
+            {'text': 'Комментарий нагрузочного теста',
+             'csrfmiddlewaretoken': token},
+            expect=(302,),
+        )
+
+    def post(self, client, rng):
+        page = self.call(client, 'post', 'GET', reverse('posts:post_create'))
+        token = self.csrf_token('post', page)
+        if token is None:
+            return
+        self.call(
+            client, 'post', 'POST', reverse('posts:post_create'),
+            {'text': 'Пост нагрузочного теста',
+             'csrfmiddlewaretoken': token},
+            expect=(302,),
+        )
+
+    def worker(self, number, deadline):
+        rng = random.Random(self.seed * 1000 + number)
+        sessions = self.targets.sessions
+        anonymous = Client(self.base_url)
+        reader = Client(
+            self.base_url, sessions[number % len(sessions)]
+        ) if sessions else None
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        try:
+            while time.monotonic() < deadline:
+                name = rng.choices(names, weights)[0]
+                if name == 'browse' or reader is None:
+                    self.browse(anonymous, rng)
+                else:
+                    getattr(self, name)(reader, rng)
+        finally:
+            anonymous.close()
+            if reader is not None:
+                reader.close()
+
+    def run(self):
+        """Drive the server for ``duration`` seconds and return stats."""
+        started = time.monotonic()
+        deadline = started + self.duration
+        threads = [
+            threading.Thread(target=self.worker, args=(number, deadline))
+            for number in range(self.clients)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.report(time.monotonic() - started)
+
+    def report(self, elapsed):
+        kinds = {}
+        for kind, values in sorted(self.latencies.items()):
+            kinds[kind] = {
+                'requests': len(values),
+                'errors': self.errors[kind],
+                'rps': round(len(values) / elapsed, 1),
+                'p50_ms': round(statistics.median(values) * 1000, 2),
+                'p90_ms': round(percentile(values, 0.90) * 1000, 2),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        errors = sum(self.errors.values())
+        return {
+            'elapsed_s': round(elapsed, 2),
+            'clients': self.clients,
+            'requests': total,
+            'rps': round(total / elapsed, 1),
+            'error_rate': round(errors / total, 4) if total else 0.0,
+            'kinds': kinds,
+        }
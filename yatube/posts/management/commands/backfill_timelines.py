@@ -0,0 +1,44 @@
+"""Rebuild materialized follow feeds."""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Follow
+from posts.timelines import get_timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Заполняет ленты подписок из таблиц постов и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пересобрать ленты только этих пользователей.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько лент пересобирать в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        timeline = get_timeline()
+        if options['usernames']:
+            readers = User.objects.filter(
+                username__in=options['usernames']
+            ).values_list('id', flat=True)
+        else:
+            readers = Follow.objects.order_by('user_id').values_list(
+                'user_id', flat=True
+            ).distinct()
+        readers = list(readers)
+        batch_size = options['batch_size']
+        for start in range(0, len(readers), batch_size):
+            with transaction.atomic():
+                for user_id in readers[start:start + batch_size]:
+                    timeline.rebuild(user_id)
+            self.stdout.write(
+                f'{min(start + batch_size, len(readers))}/{len(readers)}'
+            )
+        self.stdout.write(self.style.SUCCESS('Ленты пересобраны.'))
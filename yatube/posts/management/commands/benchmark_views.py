@@ -0,0 +1,136 @@
+"""Benchmark the main views against a generated dataset."""
+import os
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment
+)
+
+from posts import benchmarks
+from posts.datasets import PRESETS
+
+# Cold runs clear the cache before every request; on the current database
+# they get a cache of their own instead of wiping the site's one.
+ISOLATED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет медиану и 95-й перцентиль времени, число запросов и '
+        'размер ответа основных страниц и сравнивает с базовой линией.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--preset', choices=tuple(PRESETS), default='10k',
+            help='Набор данных для временной тестовой базы.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--current-db', action='store_true',
+            help=(
+                'Мерить на текущей базе, а не на временной; холодный '
+                'замер идёт с отдельным кэшем.'
+            ),
+        )
+        parser.add_argument(
+            '--runs', type=int, default=20,
+            help='Сколько раз запрашивать каждую страницу.',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Сколько запросов сделать до замера.',
+        )
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Не очищать кэш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--views', nargs='*',
+            help='Мерить только эти страницы.',
+        )
+        parser.add_argument(
+            '-o', '--output', default='benchmark.json',
+            help='Куда записать результаты в JSON.',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Базовая линия в JSON для сравнения.',
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Записать результаты в файл базовой линии.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=benchmarks.DEFAULT_THRESHOLD,
+            help='Во сколько раз можно замедлиться без ошибки.',
+        )
+
+    def handle(self, *args, **options):
+        if options['current_db'] and not options['warm']:
+            with override_settings(CACHES=ISOLATED_CACHES):
+                results = self.run(options)
+        elif options['current_db']:
+            results = self.run(options)
+        else:
+            results = self.run_on_dataset(options)
+        for name, stats in results['views'].items():
+            self.stdout.write(
+                f'{name:<14} медиана {stats["median_ms"]:8.2f} мс  '
+                f'p95 {stats["p95_ms"]:8.2f} мс  '
+                f'запросов {stats["queries"]:3}  '
+                f'{stats["bytes"]:7} байт  HTTP {stats["status"]}'
+            )
+        benchmarks.save(results, options['output'])
+        baseline = options['baseline']
+        if baseline and options['save_baseline']:
+            benchmarks.save(results, baseline)
+            self.stdout.write(f'Базовая линия записана в {baseline}.')
+        elif baseline:
+            if not os.path.exists(baseline):
+                raise CommandError(f'Нет базовой линии {baseline}.')
+            regressions = benchmarks.compare(
+                results, benchmarks.load(baseline), options['threshold']
+            )
+            if regressions:
+                raise CommandError(
+                    'Регрессия производительности:\n' + '\n'.join(regressions)
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты записаны в {options["output"]}.'
+        ))
+
+    def run(self, options):
+        return benchmarks.run(
+            runs=options['runs'],
+            warmup=options['warmup'],
+            cold=not options['warm'],
+            only=options['views'],
+        )
+
+    def run_on_dataset(self, options):
+        """Measure on a throwaway database filled by generate_dataset."""
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            self.stdout.write('Генерирую набор данных...')
+            call_command(
+                'generate_dataset', preset=options['preset'],
+                seed=options['seed'], stdout=StringIO(),
+            )
+            results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        results['meta'].update(preset=options['preset'], seed=options['seed'])
+        return results
@@ -0,0 +1,72 @@
+"""Stream posts, comments, follows and groups as NDJSON."""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.exports import (
+    CHUNK_SIZE, iter_gzip, iter_lines, iter_records, parse_since
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии и подписки в NDJSON, '
+        'не загружая таблицы в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-o', '--output', default='-',
+            help='Файл выгрузки, по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--since',
+            help='Водяной знак прошлой выгрузки: выгрузить только новое.',
+        )
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='Сжимать выгрузку gzip на лету.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Сколько строк читать из базы за раз.',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = parse_since(options['since'])
+            except ValueError as error:
+                raise CommandError(error)
+        written = 0
+        watermark = None
+
+        def records():
+            nonlocal written, watermark
+            for record in iter_records(
+                since, chunk_size=options['chunk_size']
+            ):
+                if record['type'] == 'watermark':
+                    watermark = record['since']
+                else:
+                    written += 1
+                yield record
+
+        stream = iter_lines(records())
+        if options['gzip']:
+            stream = iter_gzip(stream)
+        if options['output'] == '-':
+            self.write_stream(sys.stdout.buffer, stream)
+        else:
+            with open(options['output'], 'wb') as output:
+                self.write_stream(output, stream)
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено записей: {written}. '
+            f'Водяной знак: {watermark.isoformat()}'
+        ))
+
+    def write_stream(self, output, stream):
+        for chunk in stream:
+            output.write(chunk)
+        output.flush()
@@ -0,0 +1,89 @@
+"""Generate a reproducible dataset for load tests."""
+import time
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts.datasets import FOLLOWS_PER_USER, PRESETS, Dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт пользователей, группы, посты, комментарии и подписки '
+        'для нагрузочных тестов; одинаковый seed даёт одинаковые данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--preset', choices=tuple(PRESETS), default='10k',
+            help='Размер набора по числу постов.',
+        )
+        for name, title in (
+            ('posts', 'постов'), ('users', 'пользователей'),
+            ('groups', 'групп'), ('comments', 'комментариев'),
+        ):
+            parser.add_argument(
+                f'--{name}', type=int,
+                help=f'Число {title} вместо пресета.',
+            )
+        parser.add_argument(
+            '--follows-per-user', type=int, default=FOLLOWS_PER_USER,
+            help='Среднее число подписок пользователя.',
+        )
+        parser.add_argument(
+            '--images', type=int, default=0,
+            help='Сколько разных картинок нарисовать для постов.',
+        )
+        parser.add_argument(
+            '--image-share', type=float, default=0.1,
+            help='Доля постов с картинкой.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Сколько строк записывать в одной транзакции.',
+        )
+        parser.add_argument(
+            '--no-timelines', action='store_true',
+            help='Не заполнять ленты подписок.',
+        )
+        parser.add_argument(
+            '--no-search', action='store_true',
+            help='Не пересобирать поисковый индекс.',
+        )
+
+    def handle(self, *args, **options):
+        sizes = dict(PRESETS[options['preset']])
+        for name in sizes:
+            if options[name] is not None:
+                sizes[name] = options[name]
+        dataset = Dataset(
+            follows_per_user=options['follows_per_user'],
+            images=options['images'],
+            image_share=options['image_share'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            **sizes,
+        )
+        started = time.monotonic()
+        written = {}
+        for table, rows in dataset.generate():
+            written[table] = rows
+            self.stdout.write(f'{table}: {rows}')
+        total = sum(written.values())
+        rate = total / max(time.monotonic() - started, 1e-6)
+        self.stdout.write(f'Записано строк: {total} ({rate:.0f} строк/с)')
+        self.finish(options)
+
+    def finish(self, options):
+        """Rebuild what the signals would have kept up to date."""
+        batch = {'batch_size': options['batch_size'], 'stdout': self.stdout}
+        call_command('recount', **batch)
+        if not options['no_search']:
+            call_command('rebuild_search_index', **batch)
+        if not options['no_timelines']:
+            call_command('backfill_timelines', **batch)
+        # Pages of the feeds were cached before the new rows appeared.
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS('Набор данных готов.'))
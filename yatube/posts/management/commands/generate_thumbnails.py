@@ -0,0 +1,63 @@
+"""Worker that renders pending thumbnails."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import get_option, pending, run_job
+
+
+class Command(BaseCommand):
+    help = 'Готовит миниатюры картинок постов, ожидающих обработки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=get_option('WORKERS'),
+            help='Число потоков обработки; 1 - в основном потоке.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько постов брать за один проход.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь и завершиться.',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Сначала поставить в очередь все посты с картинками.',
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            Post.objects.exclude(image='').update(thumbnails_ready=False)
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(options['workers']) as pool:
+                self.drain(pool.map, options)
+        else:
+            self.drain(map, options)
+        self.stdout.write(self.style.SUCCESS('Очередь миниатюр пуста.'))
+
+    def drain(self, run_all, options):
+        done = 0
+        last_pk = 0
+        while True:
+            ids = list(pending().filter(pk__gt=last_pk).order_by(
+                'pk'
+            ).values_list('pk', flat=True)[:options['batch_size']])
+            if ids:
+                list(run_all(run_job, ids))
+                done += len(ids)
+                last_pk = ids[-1]
+                self.stdout.write(f'Обработано постов: {done}')
+                continue
+            if options['once']:
+                return
+            # Failed posts stay pending and are retried on the next pass.
+            last_pk = 0
+            time.sleep(options['interval'])
@@ -0,0 +1,84 @@
+"""Bulk load groups, posts, comments and follows."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts.caching import invalidate
+from posts.counters import COUNTERS, recount
+from posts.imports import BATCH_SIZE, Importer, open_stream, read_rows
+from posts.signals import feed_scopes
+
+# Сколько ошибочных строк показывать в отчёте.
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии и подписки из NDJSON '
+        'или CSV пачками через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='+',
+            help='Файлы NDJSON или CSV, можно .gz; - читает stdin.',
+        )
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'),
+            help='Формат файлов, по умолчанию по расширению.',
+        )
+        parser.add_argument(
+            '--type', default='post', choices=Importer.TYPES,
+            help='Тип строк без поля type и строк CSV.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько строк записывать в одной транзакции.',
+        )
+        parser.add_argument(
+            '--no-recount', action='store_true',
+            help='Не пересчитывать счётчики после загрузки.',
+        )
+
+    def handle(self, *args, **options):
+        importer = Importer(options['batch_size'])
+        started = time.monotonic()
+        for path in options['paths']:
+            file_format = options['format'] or (
+                'csv' if path.endswith(('.csv', '.csv.gz')) else 'ndjson'
+            )
+            with open_stream(path) as stream:
+                rows = read_rows(stream, file_format, options['type'])
+                try:
+                    for created in importer.run(rows):
+                        self.report(created, started)
+                except IntegrityError as error:
+                    raise CommandError(f'{path}: {error}')
+        for number, message in importer.errors[:MAX_REPORTED_ERRORS]:
+            self.stderr.write(f'Строка {number}: {message}')
+        if not options['no_recount']:
+            for model, field, counted, link in COUNTERS:
+                recount(model, field, counted, link, options['batch_size'])
+        invalidate(*feed_scopes(
+            author_ids=importer.author_ids | importer.reader_ids,
+            group_ids=importer.touched_group_ids,
+        ), *(f'follow:{pk}' for pk in importer.reader_ids))
+        total = self.report(importer.created, started)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено строк: {total}, ошибок: {len(importer.errors)}.'
+        ))
+        if importer.created['post'] or importer.created['follow']:
+            self.stdout.write(
+                'Ленты подписок обновляет команда backfill_timelines, '
+                'поисковый индекс - rebuild_search_index.'
+            )
+
+    def report(self, created, started):
+        total = sum(created.values())
+        rate = total / max(time.monotonic() - started, 1e-6)
+        counts = ', '.join(
+            f'{kind}: {count}' for kind, count in created.items()
+        )
+        self.stdout.write(f'{counts} ({rate:.0f} строк/с)')
+        return total
@@ -0,0 +1,121 @@
+"""Drive a local server of the project with concurrent clients."""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.loadtest import DEFAULT_MIX, LoadTest, Targets, parse_mix, serve
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает сайт на localhost (WSGI или ASGI) и нагружает его '
+        'смесью запросов; выводит RPS, перцентили времени и долю ошибок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server', choices=('wsgi', 'asgi', 'both'), default='wsgi',
+            help=(
+                'wsgi - WSGI-приложение, asgi - ASGI с асинхронными лентами, '
+                'both - оба по очереди со сравнением пропускной способности; '
+                'оба запускаются под uvicorn.'
+            ),
+        )
+        parser.add_argument(
+            '--url',
+            help='Нагружать уже запущенный сервер по этому адресу.',
+        )
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Число процессов uvicorn для обоих интерфейсов.',
+        )
+        parser.add_argument(
+            '--clients', type=int, default=20,
+            help='Число одновременных клиентов.',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10.0,
+            help='Длительность нагрузки в секундах.',
+        )
+        parser.add_argument(
+            '--mix',
+            default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+            help='Веса сценариев browse, follow, comment и post.',
+        )
+        parser.add_argument(
+            '--readers', type=int, default=50,
+            help='Сколько пользователей с подписками залогинить.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '-o', '--output',
+            help='Записать результаты в JSON.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as error:
+            raise CommandError(error)
+        targets = Targets(options['readers'])
+        if options['url']:
+            stats = self.run(options['url'], targets, mix, options)
+            stats['server'] = options['url']
+            self.report(stats)
+            self.save(stats, options)
+            return
+        servers = options['server']
+        servers = ('wsgi', 'asgi') if servers == 'both' else (servers,)
+        results = {}
+        for server in servers:
+            try:
+                with serve(
+                    server, options['port'], options['workers']
+                ) as url:
+                    stats = self.run(url, targets, mix, options)
+            except RuntimeError as error:
+                raise CommandError(error)
+            stats['server'] = server
+            self.report(stats)
+            results[server] = stats
+        if len(results) > 1:
+            wsgi, asgi = results['wsgi'], results['asgi']
+            ratio = asgi['rps'] / wsgi['rps'] if wsgi['rps'] else 0
+            self.stdout.write(
+                f'ASGI/WSGI: {asgi["rps"]} / {wsgi["rps"]} RPS '
+                f'= {ratio:.2f}'
+            )
+            self.save(results, options)
+        else:
+            self.save(stats, options)
+
+    def run(self, url, targets, mix, options):
+        self.stdout.write(
+            f'Нагружаю {url}: {options["clients"]} клиентов, '
+            f'{options["duration"]} с'
+        )
+        return LoadTest(
+            url, targets, clients=options['clients'],
+            duration=options['duration'], mix=mix, seed=options['seed'],
+        ).run()
+
+    def report(self, stats):
+        self.stdout.write(
+            f'{stats["server"]}: {stats["requests"]} запросов '
+            f'за {stats["elapsed_s"]} с: {stats["rps"]} RPS, '
+            f'ошибок {stats["error_rate"]:.2%}'
+        )
+        for kind, item in stats['kinds'].items():
+            self.stdout.write(
+                f'  {kind:<8} {item["requests"]:6} запр. '
+                f'{item["rps"]:7} RPS  p50 {item["p50_ms"]:8.2f} мс  '
+                f'p90 {item["p90_ms"]:8.2f} мс  p99 {item["p99_ms"]:8.2f} мс  '
+                f'ошибок {item["errors"]}'
+            )
+
+    def save(self, results, options):
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS('Готово.'))
@@ -0,0 +1,22 @@
+"""Rebuild the full-text index of posts."""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import get_search
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает поисковый индекс постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов индексировать за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexed = get_search().rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {indexed}'
+        ))
@@ -0,0 +1,37 @@
+"""Repair denormalized counters."""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts.counters import COUNTERS, recount
+from posts.models import UserStats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк пересчитывать в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        missing = User.objects.filter(stats__isnull=True).values_list(
+            'pk', flat=True
+        )
+        while True:
+            pks = list(missing[:batch_size])
+            if not pks:
+                break
+            UserStats.objects.bulk_create(
+                [UserStats(user_id=pk) for pk in pks], ignore_conflicts=True
+            )
+        for model, field, counted, link in COUNTERS:
+            fixed = recount(model, field, counted, link, batch_size)
+            self.stdout.write(
+                f'{model._meta.model_name}.{field}: исправлено {fixed}'
+            )
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
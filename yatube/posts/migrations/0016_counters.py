@@ -0,0 +1,67 @@
+# Generated by Django 3.2 on 2026-10-18 02:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    UserStats = apps.get_model('posts', 'UserStats')
+    for group in Group.objects.annotate(total=Count('posts')):
+        Group.objects.filter(pk=group.pk).update(posts_count=group.total)
+    for post in Post.objects.annotate(total=Count('comments')).iterator():
+        if post.total:
+            Post.objects.filter(pk=post.pk).update(comments_count=post.total)
+    users = User.objects.annotate(
+        posts_total=Count('posts', distinct=True),
+        followers_total=Count('following', distinct=True),
+        following_total=Count('follower', distinct=True),
+    )
+    UserStats.objects.bulk_create(
+        UserStats(
+            user_id=user.pk,
+            posts_count=user.posts_total,
+            followers_count=user.followers_total,
+            following_count=user.following_total,
+        )
+        for user in users.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0015_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Число подписок')),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnails_ready',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Миниатюры готовы'),
+        ),
+    ]
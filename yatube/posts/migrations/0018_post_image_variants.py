@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_thumbnails_ready'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Варианты картинки'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2 on 2026-10-18 11:05
+
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5('
+        "text, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        'INSERT INTO posts_post_fts(rowid, text) '
+        'SELECT id, text FROM posts_post'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def backfill_timelines(apps, schema_editor):
+    """Fill the follow feeds of follows made before timelines existed."""
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    UserStats = apps.get_model('posts', 'UserStats')
+    if TimelineEntry.objects.exists() or not Follow.objects.exists():
+        return
+    options = getattr(settings, 'POSTS_TIMELINE', {})
+    max_length = options.get('MAX_LENGTH', 800)
+    heavy = UserStats.objects.filter(
+        followers_count__gt=options.get('FANOUT_THRESHOLD', 1000)
+    ).values('user_id')
+    readers = list(Follow.objects.order_by('user_id').values_list(
+        'user_id', flat=True
+    ).distinct())
+    for user_id in readers:
+        authors = Follow.objects.filter(user_id=user_id).exclude(
+            author_id__in=heavy
+        ).values('author_id')
+        newest = Post.objects.filter(author_id__in=authors).order_by(
+            '-pub_date'
+        ).values_list('id', 'pub_date')[:max_length]
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+                for pk, pub_date in newest
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_post_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2 on 2026-10-18 04:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_backfill_timelines'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearchIndex',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='posts.post')),
+                ('text', models.TextField()),
+            ],
+            options={
+                'db_table': 'posts_post_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -12,6 +12,9 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Число постов', default=0, editable=False
+    )
 
     def __str__(self):
         """Group name."""
@@ -27,6 +30,9 @@ class Post(models.Model):
     pub_date = models.DateTimeField(auto_now_add=True,
                                     verbose_name='Дата публикации'
                                     )
+    updated = models.DateTimeField(
+        'Дата изменения', auto_now=True, editable=False
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -46,6 +52,15 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев', default=0, editable=False
+    )
+    thumbnails_ready = models.BooleanField(
+        'Миниатюры готовы', default=True, editable=False
+    )
+    image_variants = models.JSONField(
+        'Варианты картинки', default=list, blank=True, editable=False
+    )
 
     class Meta:
         """Useful Meta."""
@@ -53,6 +68,17 @@ class Post(models.Model):
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_date_idx',
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_date_idx',
+            ),
+            models.Index(fields=('-pub_date', '-id'), name='post_date_idx'),
+        ]
 
     def __str__(self):
         """Posts name."""
@@ -91,6 +117,11 @@ class Comment(CreatedModel):
         ordering = ['-created']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=('post', '-created'), name='comment_post_created_idx'
+            ),
+        ]
 
 
 class Follow (models.Model):
@@ -119,3 +150,100 @@ class Follow (models.Model):
 
         verbose_name = 'Подписчик'
         verbose_name_plural = 'Подписчики'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Denormalized counters of a user."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+    def __str__(self):
+        """Stats name."""
+
+        return str(self.user_id)
+
+    class Meta:
+        """Useful Meta."""
+
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class TimelineEntry(models.Model):
+    """Post delivered to the follow feed of a reader."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    def __str__(self):
+        """Entry name."""
+
+        return f'{self.user_id}: {self.post_id}'
+
+    class Meta:
+        """Useful Meta."""
+
+        ordering = ['-pub_date']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date'), name='timeline_user_date_idx'
+            ),
+        ]
+
+
+class PostSearchIndex(models.Model):
+    """Row of the FTS5 index of post texts (see ``posts.search``).
+
+    The table is created by a migration on SQLite only, so the model is
+    unmanaged; it lets querysets of posts join the index.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_index',
+    )
+    text = models.TextField()
+
+    class Meta:
+        """Useful Meta."""
+
+        managed = False
+        db_table = 'posts_post_fts'
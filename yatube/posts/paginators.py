@@ -0,0 +1,261 @@
+"""Paginators for post feeds."""
+import base64
+import binascii
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+# Queries of the row count of a table from the statistics of the DBMS.
+TABLE_ROWS_SQL = {
+    'postgresql': 'SELECT reltuples FROM pg_class WHERE relname = %s',
+    'mysql': (
+        'SELECT table_rows FROM information_schema.tables '
+        'WHERE table_schema = DATABASE() AND table_name = %s'
+    ),
+    'sqlite': 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+}
+
+
+class InvalidCursor(Exception):
+    """Cursor token is damaged or forged."""
+
+
+def encode_cursor(post, reverse=False):
+    """Pack the (pub_date, id) position of a post into an opaque token."""
+    payload = {'d': post.pub_date.isoformat(), 'i': post.pk}
+    if reverse:
+        payload['r'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Unpack a token into (pub_date, id, reverse)."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        pub_date = parse_datetime(payload['d'])
+        pk = int(payload['i'])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursor(token)
+    if pub_date is None:
+        raise InvalidCursor(token)
+    return pub_date, pk, bool(payload.get('r'))
+
+
+class CursorPage(Page):
+    """Page of a keyset feed.
+
+    Keeps the ``Page`` contract for templates, but knows nothing
+    about page numbers: neighbours are reached by cursor tokens.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page of %s items>' % len(self.object_list)
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return encode_cursor(self.object_list[0], reverse=True)
+
+
+class CursorPaginator(Paginator):
+    """Keyset paginator ordered by (-pub_date, -id).
+
+    Every page is one indexed range read of ``per_page + 1`` rows,
+    no ``COUNT(*)`` and no ``OFFSET``, so page 500 costs as much
+    as page 1.
+    """
+
+    page_kwarg = 'cursor'
+
+    def get_page(self, cursor):
+        """Return the page for a token, the first one for a bad token."""
+        position = None
+        if cursor:
+            try:
+                position = decode_cursor(cursor)
+            except InvalidCursor:
+                pass
+        return self.page(position)
+
+    def page(self, position):
+        limit = self.per_page + 1
+        if position is None:
+            rows = list(self._ordered(descending=True)[:limit])
+            return CursorPage(
+                rows[:self.per_page], self, len(rows) == limit, False
+            )
+        pub_date, pk, reverse = position
+        if reverse:
+            newer = (
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+            )
+            rows = list(
+                self._ordered(descending=False).filter(newer)[:limit]
+            )
+            has_more = len(rows) == limit
+            rows = rows[:self.per_page]
+            rows.reverse()
+            return CursorPage(rows, self, True, has_more)
+        older = Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+        rows = list(self._ordered(descending=True).filter(older)[:limit])
+        return CursorPage(
+            rows[:self.per_page], self, len(rows) == limit, True
+        )
+
+    def _ordered(self, descending):
+        if descending:
+            return self.object_list.order_by('-pub_date', '-pk')
+        return self.object_list.order_by('pub_date', 'pk')
+
+
+def estimate_table_rows(model, using='default'):
+    """Row count of a table from the database statistics, if there are.
+
+    The answer, or its absence, is cached like exact counts.
+    """
+    key = f'table-rows:{using}:{model._meta.db_table}'
+    rows = cache.get(key)
+    if rows is None:
+        rows = _read_table_rows(model, using)
+        if rows is None:
+            rows = -1
+        cache.set(
+            key, rows, getattr(settings, 'POSTS_COUNT_CACHE_TIMEOUT', 60)
+        )
+    return None if rows < 0 else rows
+
+
+def _read_table_rows(model, using):
+    connection = connections[using]
+    sql = TABLE_ROWS_SQL.get(connection.vendor)
+    if sql is None:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [model._meta.db_table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # sqlite_stat1 exists only after ANALYZE.
+        return None
+    if row is None or row[0] is None:
+        return None
+    # sqlite keeps "rows avg-rows-per-key ..." in one string.
+    return int(float(str(row[0]).split()[0]))
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that avoids an exact COUNT(*) on big result sets.
+
+    The count is taken from ``count_hint`` (a number or a callable,
+    e.g. a denormalized counter), from the database statistics for
+    unfiltered tables or from a count cached for a while. Result sets
+    estimated below ``exact_threshold`` rows are counted exactly. A
+    cached count is kept per ``count_version``, a token of the version of
+    the data such as the version of a cached feed.
+
+    An estimate may lag behind the data, so a request for its last page
+    or beyond switches to the cached count, and stale statistics never
+    hide the pages past them.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True, count_hint=None,
+                 exact_threshold=None, count_version=None):
+        super().__init__(object_list, per_page, orphans,
+                         allow_empty_first_page)
+        self.estimated = False
+        self.count_hint = count_hint
+        self.count_version = count_version
+        if exact_threshold is None:
+            exact_threshold = getattr(
+                settings, 'POSTS_EXACT_COUNT_THRESHOLD', 1000
+            )
+        self.exact_threshold = exact_threshold
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate()
+        if estimate is None:
+            return self.cached_count()
+        if estimate < self.exact_threshold:
+            return super().count
+        self.estimated = True
+        return estimate
+
+    def validate_number(self, number):
+        try:
+            valid = super().validate_number(number)
+        except EmptyPage:
+            if not self.estimated:
+                raise
+            valid = self.num_pages
+        if self.estimated and valid >= self.num_pages:
+            self.recount()
+            return super().validate_number(number)
+        return valid
+
+    def recount(self):
+        """Replace the estimated count with the cached one."""
+        self.estimated = False
+        self.count = self.cached_count()
+        self.__dict__.pop('num_pages', None)
+
+    def estimate(self):
+        if callable(self.count_hint):
+            return self.count_hint()
+        if self.count_hint is not None:
+            return self.count_hint
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where or query.distinct:
+            return None
+        return estimate_table_rows(query.model, self.object_list.db)
+
+    def cached_count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        query = f'{self.object_list.query}|{self.count_version}'.encode()
+        key = f'paginator-count:{hashlib.md5(query).hexdigest()}'
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(
+                key, count,
+                getattr(settings, 'POSTS_COUNT_CACHE_TIMEOUT', 60),
+            )
+        return count
+
+
+PAGINATORS = {
+    'offset': Paginator,
+    'estimated': EstimatedCountPaginator,
+    'cursor': CursorPaginator,
+}
@@ -0,0 +1,159 @@
+"""Full-text search over posts.
+
+The search engine is pluggable like the timeline store: ``POSTS_SEARCH``
+names the backend class. The default one keeps post texts in an SQLite
+FTS5 table, synced by the ``Post`` signals, and ranks matches by BM25.
+On another database, where the migration creates no such table, the
+search falls back to ``LikeSearch``.
+"""
+import operator
+import re
+from functools import reduce
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from posts.models import Post
+
+DEFAULTS = {
+    'BACKEND': 'posts.search.SQLiteSearch',
+}
+
+WORD_RE = re.compile(r'\w+')
+
+
+def get_option(name):
+    return getattr(settings, 'POSTS_SEARCH', {}).get(name, DEFAULTS[name])
+
+
+def get_search():
+    """Return the configured search backend, if it fits the database."""
+    search = import_string(get_option('BACKEND'))()
+    if search.vendor not in (None, connection.vendor):
+        return LikeSearch()
+    return search
+
+
+class BaseSearch:
+    """Interface of a search engine."""
+
+    # Database the backend works on, None for any.
+    vendor = None
+
+    def update(self, posts):
+        """Index new posts or new versions of indexed ones."""
+        raise NotImplementedError
+
+    def remove(self, post_ids):
+        """Drop deleted posts from the index."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Drop every post from the index."""
+        raise NotImplementedError
+
+    def filter(self, queryset, query):
+        """Narrow a queryset of posts to the matches of a query."""
+        raise NotImplementedError
+
+    def ranked(self, queryset, query):
+        """Matches of a query, best first."""
+        raise NotImplementedError
+
+    def rebuild(self, batch_size=1000):
+        """Reindex all posts in primary key batches, return their number."""
+        self.clear()
+        posts = Post.objects.order_by('pk').only('pk', 'text')
+        last_pk = 0
+        indexed = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return indexed
+            self.update(batch)
+            indexed += len(batch)
+            last_pk = batch[-1].pk
+
+
+class LikeSearch(BaseSearch):
+    """No index: posts containing every word, newest first.
+
+    Scans the table, so it is only a fallback for small sites.
+    """
+
+    def update(self, posts):
+        pass
+
+    def remove(self, post_ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def rebuild(self, batch_size=1000):
+        return 0
+
+    def filter(self, queryset, query):
+        words = WORD_RE.findall(query)
+        if not words:
+            return queryset.none()
+        return queryset.filter(reduce(operator.and_, (
+            Q(text__icontains=word) for word in words
+        )))
+
+    def ranked(self, queryset, query):
+        return self.filter(queryset, query).order_by('-pub_date')
+
+
+class SQLiteSearch(BaseSearch):
+    """Index in the ``posts_post_fts`` FTS5 table, keyed by post id."""
+
+    table = 'posts_post_fts'
+    vendor = 'sqlite'
+
+    def update(self, posts):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {self.table}(rowid, text) '
+                f'VALUES (%s, %s)',
+                [(post.pk, post.text) for post in posts],
+            )
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(pk,) for pk in post_ids],
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def match(self, query):
+        """Turn reader input into an FTS5 query of all its words.
+
+        Every word is quoted, so operators and stray quotes in the input
+        are searched for instead of breaking the query syntax.
+        """
+        return ' '.join(f'"{word}"' for word in WORD_RE.findall(query))
+
+    def filter(self, queryset, query):
+        match = self.match(query)
+        if not match:
+            return queryset.none()
+        # One join with the index, the match is its own condition.
+        return queryset.filter(
+            RawSQL(
+                f'{self.table} MATCH %s', [match], output_field=BooleanField()
+            ),
+            search_index__isnull=False,
+        )
+
+    def ranked(self, queryset, query):
+        return self.filter(queryset, query).order_by(
+            RawSQL(f'bm25({self.table})', []), '-pub_date'
+        )
@@ -1,8 +1,50 @@
+from django.contrib.auth import get_user_model
 from rest_framework import serializers
-from .models import Post
+from .models import Group, Post
+
+User = get_user_model()
+
+
+class AuthorSerializer(serializers.ModelSerializer):
+    class Meta:
+        fields = ('id', 'username', 'first_name', 'last_name')
+        model = User
+
+
+class GroupSerializer(serializers.ModelSerializer):
+    class Meta:
+        fields = ('id', 'slug', 'title')
+        model = Group
 
 
 class PostSerializer(serializers.ModelSerializer):
     class Meta:
         fields = ('text', 'author', 'pub_date')
-        model = Post
\ No newline at end of file
+        model = Post
+
+
+class PostListSerializer(PostSerializer):
+    """Post of an API feed with sparse fields and embedded relations.
+
+    ``fields`` limits the output to the named fields, ``expand`` replaces
+    the ids of the named relations with their data.
+    """
+
+    EXPANDABLE = {
+        'author': AuthorSerializer,
+        'group': GroupSerializer,
+    }
+
+    class Meta(PostSerializer.Meta):
+        fields = (
+            'id', 'text', 'author', 'group', 'pub_date', 'image',
+            'comments_count',
+        )
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in expand:
+            self.fields[name] = self.EXPANDABLE[name](read_only=True)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
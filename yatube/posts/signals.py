@@ -0,0 +1,166 @@
+"""Side effects of writes to the posts models."""
+from core.tasks import enqueue
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from posts import counters, tasks
+from posts.caching import invalidate
+from posts.models import Comment, Follow, Group, Post, UserStats
+from posts.search import get_search
+from posts.timelines import get_timeline
+
+User = get_user_model()
+
+
+def feed_scopes(author_ids=(), group_ids=()):
+    """Return the scopes of the feeds that show posts of these rows.
+
+    Follow feeds include the ``author:`` scopes of the followed authors
+    (see ``posts.caching``), so followers are not looked up here.
+    """
+    scopes = ['index']
+    scopes += [
+        f'group:{slug}' for slug in Group.objects.filter(
+            pk__in=[pk for pk in group_ids if pk is not None]
+        ).values_list('slug', flat=True)
+    ]
+    scopes += [
+        f'author:{username}' for username in User.objects.filter(
+            pk__in=author_ids
+        ).values_list('username', flat=True)
+    ]
+    return scopes
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    instance._saved_group_id = Post.objects.filter(
+        pk=instance.pk
+    ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def push_to_timelines(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        enqueue(
+            tasks.push_to_timelines, instance.pk,
+            key=f'timeline:{instance.pk}',
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    group_ids = {instance.group_id, getattr(instance, '_saved_group_id', None)}
+    invalidate(
+        *feed_scopes(author_ids=[instance.author_id], group_ids=group_ids)
+    )
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    enqueue(tasks.index_post, instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    get_search().remove([instance.pk])
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def remember_group_feeds(sender, instance, **kwargs):
+    # Posts lose their group before post_delete, so collect them now.
+    instance._saved_slug = Group.objects.filter(
+        pk=instance.pk
+    ).values_list('slug', flat=True).first()
+    instance._saved_author_ids = list(
+        Post.objects.filter(group_id=instance.pk).values_list(
+            'author_id', flat=True
+        ).distinct()
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_feeds(sender, instance, **kwargs):
+    scopes = feed_scopes(author_ids=instance._saved_author_ids)
+    scopes += [f'group:{instance.slug}', f'group:{instance._saved_slug}']
+    invalidate(*scopes)
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        get_timeline().follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_timeline(sender, instance, **kwargs):
+    get_timeline().unfollow(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feeds(sender, instance, **kwargs):
+    invalidate(
+        f'follow:{instance.user_id}',
+        *[f'author:{username}' for username in User.objects.filter(
+            pk__in=[instance.author_id, instance.user_id]
+        ).values_list('username', flat=True)],
+    )
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if kwargs.get('raw'):
+        return
+    saved_group_id = getattr(instance, '_saved_group_id', None)
+    if created:
+        counters.change_user(instance.author_id, posts_count=1)
+    elif saved_group_id == instance.group_id:
+        return
+    elif saved_group_id is not None:
+        counters.change(Group, saved_group_id, posts_count=-1)
+    if instance.group_id is not None:
+        counters.change(Group, instance.group_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change(UserStats, instance.author_id, posts_count=-1)
+    if instance.group_id is not None:
+        counters.change(Group, instance.group_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        counters.change(Post, instance.post_id, comments_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change(Post, instance.post_id, comments_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        counters.change_user(instance.user_id, following_count=1)
+        counters.change_user(instance.author_id, followers_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change(UserStats, instance.user_id, following_count=-1)
+    counters.change(UserStats, instance.author_id, followers_count=-1)
@@ -0,0 +1,46 @@
+"""Background side effects of post writes.
+
+Posts are passed by id and read again when the task runs, so a task
+queued for a post deleted in the meantime does nothing.
+"""
+import time
+
+from core.tasks import enqueue, task
+
+from posts import timelines
+from posts.caching import invalidate
+from posts.models import Post
+from posts.search import get_search
+from posts.timelines import get_timeline
+
+
+@task()
+def push_to_timelines(post_id):
+    """Deliver a new post to the timelines of the author's followers."""
+    post = Post.objects.filter(pk=post_id).select_related('author').first()
+    if post is not None:
+        get_timeline().push(post)
+        # Follow feeds cached before the push lack the post.
+        invalidate(f'author:{post.author.username}')
+        schedule_trim()
+
+
+@task()
+def trim_timelines():
+    """Cut the timelines grown past MAX_LENGTH since the last run."""
+    get_timeline().trim_all()
+
+
+def schedule_trim():
+    """Queue one trim per TRIM_INTERVAL for all the pushes within it."""
+    interval = timelines.get_option('TRIM_INTERVAL')
+    key = f'timelines:trim:{int(time.time() // interval)}'
+    enqueue(trim_timelines, key=key, delay=interval)
+
+
+@task()
+def index_post(post_id):
+    """Bring the search index entry of a post up to date."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        get_search().update([post])
@@ -0,0 +1,17 @@
+"""Responsive markup for post images."""
+
+from django import template
+
+from posts.images import group_variants
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def picture(post, sizes='(max-width: 960px) 100vw, 960px'):
+    """Render a post image as <picture> with a srcset per format."""
+    return {
+        'post': post,
+        'sources': group_variants(post.image_variants),
+        'sizes': sizes,
+    }
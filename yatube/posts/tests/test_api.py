@@ -0,0 +1,125 @@
+"""Tests of the posts API."""
+
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+NUMBER_OF_POSTS = 13
+
+
+# Фоновые задачи выполняются сразу, без воркеров.
+@override_settings(TASKS={'BROKER': 'core.tasks.ImmediateBroker'})
+class PostListAPITests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Просто название группы',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        cls.user = User.objects.create_user(username='WilliamBlake')
+        cls.reader = User.objects.create_user(username='Nobody')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for i in range(NUMBER_OF_POSTS):
+            Post.objects.create(
+                text=f'Просто тестовый текст #{i}',
+                author=cls.user,
+                group=cls.group,
+            )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_walk_by_cursor(self):
+        """Ленты API отдаются страницами по курсору."""
+        urls = (
+            reverse('posts:api_posts'),
+            reverse('posts:api_group_posts', kwargs={'slug': 'test-slug'}),
+            reverse(
+                'posts:api_profile_posts',
+                kwargs={'username': self.user.username},
+            ),
+            reverse('posts:api_follow_posts'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.reader_client.get(url, {'limit': 10}).json()
+                self.assertEqual(len(first['results']), 10)
+                self.assertIsNone(first['previous'])
+                second = self.reader_client.get(first['next']).json()
+                self.assertEqual(
+                    len(second['results']), NUMBER_OF_POSTS - 10
+                )
+                self.assertIsNone(second['next'])
+
+    def test_sparse_fields_and_expand(self):
+        """Поля выбираются через fields, связи встраиваются через expand."""
+        url = reverse('posts:api_posts')
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(
+                url, {'fields': 'id,author,group', 'expand': 'author,group'}
+            )
+        post = response.json()['results'][0]
+        self.assertEqual(set(post), {'id', 'author', 'group'})
+        self.assertEqual(post['author']['username'], self.user.username)
+        self.assertEqual(post['group']['slug'], self.group.slug)
+
+    def test_unknown_field_is_rejected(self):
+        """Неизвестное поле - ошибка 400."""
+        response = self.guest_client.get(
+            reverse('posts:api_posts'), {'fields': 'password'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_follow_feed_needs_auth(self):
+        """Лента подписок API доступна только авторизованным."""
+        response = self.guest_client.get(reverse('posts:api_follow_posts'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+
+class PostBatchAPITests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='WilliamBlake')
+        cls.posts = [
+            Post.objects.create(text=f'Текст #{i}', author=cls.user)
+            for i in range(3)
+        ]
+
+    def test_batch_keeps_order_and_reports_missing(self):
+        """Пакет постов отдаётся одним запросом в порядке ids."""
+        ids = [self.posts[2].pk, 999, self.posts[0].pk]
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('posts:api_posts'),
+                {'ids': ','.join(map(str, ids)), 'expand': 'author'},
+            )
+        data = response.json()
+        self.assertEqual(
+            [post['id'] for post in data['results']],
+            [self.posts[2].pk, self.posts[0].pk],
+        )
+        self.assertEqual(data['missing'], [999])
+        self.assertEqual(
+            data['results'][0]['author']['username'], self.user.username
+        )
+
+    def test_bad_batches_are_rejected(self):
+        """Нечисловые и слишком длинные списки ids - ошибка 400."""
+        for ids in ('1,two', ','.join(map(str, range(1, 102)))):
+            with self.subTest(ids=ids[:10]):
+                response = self.client.get(
+                    reverse('posts:api_posts'), {'ids': ids}
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.BAD_REQUEST
+                )
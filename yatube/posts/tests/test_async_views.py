@@ -0,0 +1,152 @@
+"""Tests of the async views."""
+
+import asyncio
+import re
+import threading
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from core import aio, timing
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import Http404
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+)
+from posts import async_views, views
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+CSRF_TOKEN_RE = re.compile(rb'name="csrfmiddlewaretoken" value="[^"]+"')
+
+
+class AsyncViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group
+            )
+            for number in range(15)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def call(self, view, *args, user=None, **headers):
+        request = RequestFactory().get('/', **headers)
+        request.user = user or AnonymousUser()
+        if asyncio.iscoroutinefunction(view):
+            return async_to_sync(view)(request, *args)
+        return view(request, *args)
+
+    def content(self, response):
+        # Токен CSRF формы комментария меняется от ответа к ответу.
+        return CSRF_TOKEN_RE.sub(b'', response.content)
+
+    def test_same_pages(self):
+        """Асинхронные версии отдают те же страницы, что и синхронные."""
+        cases = (
+            ('index', ()),
+            ('group_posts', (self.group.slug,)),
+            ('profile', (self.author.username,)),
+            ('post_detail', (self.posts[0].pk,)),
+            ('get_post', (self.posts[0].pk,)),
+        )
+        # Поколения лент после очистки кэша те же, и ETag совпадают.
+        generation = mock.Mock(hex='0' * 32)
+        for name, args in cases:
+            for user in (AnonymousUser(), self.reader):
+                with self.subTest(view=name, user=user), mock.patch(
+                    'posts.caching.uuid4', return_value=generation
+                ):
+                    cache.clear()
+                    expected = self.call(
+                        getattr(views, name), *args, user=user
+                    )
+                    cache.clear()
+                    response = self.call(
+                        getattr(async_views, name), *args, user=user
+                    )
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(
+                        self.content(response), self.content(expected)
+                    )
+                    self.assertEqual(response['ETag'], expected['ETag'])
+
+    def test_not_found(self):
+        """Несуществующие автор и пост - 404."""
+        with self.assertRaises(Http404):
+            self.call(async_views.profile, 'nobody')
+        with self.assertRaises(Http404):
+            self.call(async_views.post_detail, 0)
+
+    def test_not_modified(self):
+        """Неизменившаяся лента отвечает 304."""
+        etag = self.call(async_views.index)['ETag']
+        response = self.call(async_views.index, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class GatherTests(SimpleTestCase):
+    def test_concurrent(self):
+        """Вызовы идут одновременно, результаты - в порядке вызовов."""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def call(value):
+            barrier.wait()
+            return value
+
+        with mock.patch.object(aio, 'is_shared', return_value=True):
+            results = async_to_sync(aio.gather)(
+                lambda: call(1), lambda: call(2)
+            )
+        self.assertEqual(results, [1, 2])
+
+    def test_private_database(self):
+        """С базой в памяти вызовы идут по очереди в потоке запроса."""
+        thread = threading.get_ident()
+        with mock.patch.object(aio, 'is_shared', return_value=False):
+            results = async_to_sync(aio.gather)(
+                threading.get_ident, threading.get_ident
+            )
+        self.assertEqual(results, [thread, thread])
+
+
+class GatherDatabaseTests(TransactionTestCase):
+    def test_queries_in_workers(self):
+        """Запросы идут в рабочих потоках, учитываются и не держат связь."""
+        User.objects.create_user(username='author')
+        thread = threading.get_ident()
+
+        def fetch():
+            return threading.get_ident(), User.objects.get()
+
+        async def main():
+            with timing.track() as stats:
+                results = await aio.gather(fetch, User.objects.count)
+            return results, stats
+
+        # Общая база в памяти видна и соединениям других потоков.
+        # Связи рабочих потоков закрываются по CONN_MAX_AGE, как в конце
+        # запроса; связь с базой в памяти Django не закрывает никогда.
+        with mock.patch.object(aio, 'is_shared', return_value=True), \
+                mock.patch.object(aio, 'close_old_connections') as close:
+            (fetched, count), stats = async_to_sync(main)()
+        worker, user = fetched
+        self.assertNotEqual(worker, thread)
+        self.assertEqual((user.username, count), ('author', 1))
+        self.assertEqual(stats.counts['db'], 2)
+        self.assertEqual(close.call_count, 2)
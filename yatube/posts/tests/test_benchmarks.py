@@ -0,0 +1,62 @@
+"""Tests of the view benchmarks."""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from posts.models import Comment, Post
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        call_command(
+            'generate_dataset', posts=40, users=8, groups=2, comments=20,
+            follows_per_user=3, stdout=StringIO(),
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output = os.path.join(directory.name, 'results.json')
+        self.baseline = os.path.join(directory.name, 'baseline.json')
+
+    def benchmark(self, *args):
+        call_command(
+            'benchmark_views', '--current-db', '--runs', '2',
+            '--warmup', '0', '-o', self.output, '--baseline', self.baseline,
+            *args, stdout=StringIO(),
+        )
+        with open(self.output, encoding='utf-8') as file:
+            return json.load(file)
+
+    def test_results_and_baseline(self):
+        """Каждая страница замерена, записи откатываются."""
+        posts, comments = Post.objects.count(), Comment.objects.count()
+        results = self.benchmark('--save-baseline')
+        self.assertEqual(set(results['views']), {
+            'index', 'group_posts', 'profile', 'post_detail',
+            'follow_index', 'get_post', 'post_create', 'add_comment',
+        })
+        for name, stats in results['views'].items():
+            with self.subTest(view=name):
+                self.assertGreater(stats['queries'], 0)
+                self.assertLessEqual(stats['median_ms'], stats['p95_ms'])
+        self.assertEqual(Post.objects.count(), posts)
+        self.assertEqual(Comment.objects.count(), comments)
+
+    def test_regressions_are_flagged(self):
+        """Лишний запрос относительно базовой линии - ошибка."""
+        results = self.benchmark('--save-baseline')
+        results['views']['index']['queries'] -= 1
+        with open(self.baseline, 'w', encoding='utf-8') as file:
+            json.dump(results, file)
+        with self.assertRaisesMessage(CommandError, 'index: queries'):
+            self.benchmark('--views', 'index')
+
+    def test_cold_run_keeps_site_cache(self):
+        """Холодный замер на текущей базе не очищает кэш сайта."""
+        cache.set('site-key', 'value')
+        self.benchmark('--views', 'index', '--save-baseline')
+        self.assertEqual(cache.get('site-key'), 'value')
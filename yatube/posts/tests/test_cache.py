@@ -1,10 +1,21 @@
 """Tests of cache."""
 
+import time
+import warnings
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from core.cache import cache_response, get_cache_key, get_stats, reset_stats
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
-from django.test import Client, TestCase
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import CacheKeyWarning
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
 from django.urls import reverse
-from posts.models import Post
+from posts.caching import get_feed_timeout
+from posts.models import Follow, Group, Post
 
 User = get_user_model()
 
@@ -17,18 +28,195 @@ class CacheTests(TestCase):
         cls.user = User.objects.create_user(username='WilliamBlake')
         cls.author = Client()
         cls.author.force_login(cls.user)
+        cls.group = Group.objects.create(
+            title='Просто название группы',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        cls.group_another = Group.objects.create(
+            title='Другая группа',
+            slug='test-another_slug',
+            description='Описание другой группы',
+        )
         cls.post = Post.objects.create(
             text='Simpliest text in the world',
             author=cls.user,
+            group=cls.group,
         )
 
-    def test_cache(self):
+    def setUp(self):
         cache.clear()
+
+    def test_cache(self):
+        """Главная страница берётся из кэша, пока посты не менялись."""
+        template = reverse('posts:index')
+        response01 = self.author.get(template)
+        response02 = self.author.get(template)
+        self.assertIsNotNone(response01.context)
+        self.assertIsNone(response02.context)
+        self.assertEqual(response01.content, response02.content)
+
+    def test_post_delete_invalidates_feeds(self):
+        """Удаление поста сразу сбрасывает ленты, где он был."""
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        )
+        responses = [self.author.get(page).content for page in pages]
+        Post.objects.get(pk=self.post.pk).delete()
+        for page, response01 in zip(pages, responses):
+            with self.subTest(page=page):
+                response02 = self.author.get(page)
+                self.assertIsNotNone(response02.context)
+                self.assertNotEqual(response01, response02.content)
+
+    def test_write_keeps_untouched_feeds(self):
+        """Пост в одной группе не сбрасывает кэш другой группы."""
+        template = reverse(
+            'posts:group_list', kwargs={'slug': self.group_another.slug}
+        )
+        self.author.get(template)
+        Post.objects.create(
+            text='Another text', author=self.user, group=self.group
+        )
+        self.assertIsNone(self.author.get(template).context)
+
+    def test_author_post_invalidates_follow_feed(self):
+        """Пост автора сбрасывает ленту подписчика без обхода подписчиков."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        client = Client()
+        client.force_login(reader)
+        template = reverse('posts:follow_index')
+        client.get(template)
+        self.assertIsNone(client.get(template).context)
+        Post.objects.create(text='Новый пост', author=self.user)
+        self.assertIsNotNone(client.get(template).context)
+
+    def test_keys_of_non_ascii_scopes(self):
+        """Кириллический слаг не даёт недопустимых ключей кэша."""
+        group = Group.objects.create(
+            title='Кириллица', slug='группа', description='Описание'
+        )
+        template = reverse('posts:group_list', kwargs={'slug': group.slug})
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.author.get(template)
+            Post.objects.create(text='Текст', author=self.user, group=group)
+            self.author.get(template)
+        self.assertFalse([
+            warning for warning in caught
+            if issubclass(warning.category, CacheKeyWarning)
+        ])
+
+    @override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'worker',
+        },
+        'other': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'other-worker',
+        },
+    })
+    def test_invalidation_from_another_process(self):
+        """Сброс из процесса с другим локальным кэшем ждёт короткий таймаут."""
         template = reverse('posts:index')
-        response01 = self.author.get(template).content
-        Post.objects.get(pk=1).delete()
-        response02 = self.author.get(template).content
-        self.assertEqual(response01, response02)
+        self.author.get(template)
+        # Пост пишет другой процесс, сброс попадает в его кэш.
+        with mock.patch('posts.caching.cache', caches['other']):
+            Post.objects.create(text='Новый пост', author=self.user)
+        self.assertIsNone(self.author.get(template).context)
+        later = time.time() + get_feed_timeout() + 1
+        with mock.patch('time.time', return_value=later):
+            response = self.author.get(template)
+        self.assertIsNotNone(response.context)
+        self.assertContains(response, 'Новый пост')
+
+    def test_feed_timeout_of_backends(self):
+        """Долгий таймаут лент только с общим для процессов кэшем."""
+        self.assertLess(get_feed_timeout(), 60)
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_table',
+        }}):
+            self.assertEqual(get_feed_timeout(), 60 * 60 * 24)
+
+
+class CacheResponseTests(SimpleTestCase):
+    def setUp(self):
         cache.clear()
-        response03 = self.author.get(template).content
-        self.assertNotEqual(response01, response03)
+        reset_stats()
+        self.calls = 0
+        self.request = RequestFactory().get('/feed/')
+        self.request.user = AnonymousUser()
+
+    def _view(self, request):
+        self.calls += 1
+        return HttpResponse(f'render #{self.calls}')
+
+    def test_hit_after_miss(self):
+        """Второй запрос отдаётся из кэша."""
+        view = cache_response(60, key_prefix='feed', name='test')(self._view)
+        view(self.request)
+        response = view(self.request)
+        self.assertEqual(response.content, b'render #1')
+        self.assertEqual(
+            get_stats(), {'test.misses': 1, 'test.hits': 1}
+        )
+
+    def test_stale_copy_served_while_locked(self):
+        """Пока запись пересчитывает другой воркер, отдаётся старая копия."""
+        view = cache_response(
+            60, key_prefix='feed', name='test', beta=0
+        )(self._view)
+        view(self.request)
+        key = get_cache_key(self.request, 'feed')
+        entry = cache.get(key)
+        cache.set(key, entry._replace(expires=time.time() - 1))
+        cache.add(f'{key}.lock', 1)
+        response = view(self.request)
+        self.assertEqual(response.content, b'render #1')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(get_stats()['test.stale'], 1)
+
+    def test_lock_wait_without_copy(self):
+        """Без старой копии запрос ждёт, пока снимут блокировку."""
+        view = cache_response(
+            60, key_prefix='feed', name='test', lock_timeout=0.2
+        )(self._view)
+        key = get_cache_key(self.request, 'feed')
+        cache.add(f'{key}.lock', 1, 0.1)
+        response = view(self.request)
+        self.assertEqual(response.content, b'render #1')
+        self.assertEqual(get_stats()['test.lock_waits'], 1)
+
+    def test_old_version_served_while_locked(self):
+        """После смены версии старая копия отдаётся, пока страницу считают."""
+        version = '1'
+        view = cache_response(
+            60, key_prefix='feed', name='test', version=lambda r: version
+        )(self._view)
+        view(self.request)
+        version = '2'
+        key = get_cache_key(self.request, 'feed')
+        cache.add(f'{key}.lock', 1)
+        self.assertEqual(view(self.request).content, b'render #1')
+        self.assertEqual(get_stats()['test.stale'], 1)
+        cache.delete(f'{key}.lock')
+        self.assertEqual(view(self.request).content, b'render #2')
+        self.assertEqual(view(self.request).content, b'render #2')
+
+    def test_async_view(self):
+        """Асинхронное представление кэшируется без обёртки в синхронное."""
+        async def view(request):
+            return self._view(request)
+
+        cached = cache_response(60, key_prefix='feed', name='test')(view)
+        async_to_sync(cached)(self.request)
+        response = async_to_sync(cached)(self.request)
+        self.assertEqual(response.content, b'render #1')
+        self.assertEqual(
+            get_stats(), {'test.misses': 1, 'test.hits': 1}
+        )
@@ -0,0 +1,140 @@
+"""Tests of conditional GET."""
+import hashlib
+from http import HTTPStatus
+
+from core.cache import get_cache_key
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='WilliamBlake')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Просто название группы',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        cls.post = Post.objects.create(
+            text='Simpliest text in the world',
+            author=cls.user,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author = Client()
+        self.author.force_login(self.user)
+
+    def revalidate(self, client, url):
+        response = client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('ETag', response)
+        return client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_pages_are_not_modified(self):
+        """Неизменная страница отдаётся как 304 без рендеринга."""
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+            reverse('posts:get_post', kwargs={'pk': self.post.pk}),
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.revalidate(self.author, page)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                self.assertEqual(response.content, b'')
+
+    def test_changes_make_etags_stale(self):
+        """Правка, новый пост или комментарий меняют ETag."""
+        index = reverse('posts:index')
+        detail = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        changes = (
+            (index, lambda: self.post.save()),
+            (index, lambda: Post.objects.create(
+                text='Новый пост', author=self.user
+            )),
+            (detail, lambda: Comment.objects.create(
+                text='Комментарий', post=self.post, author=self.user
+            )),
+        )
+        for page, change in changes:
+            with self.subTest(page=page):
+                etag = self.author.get(page)['ETag']
+                change()
+                response = self.author.get(page, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_etag_depends_on_reader(self):
+        """Разные читатели получают разные ETag одной страницы."""
+        reader = Client()
+        reader.force_login(self.reader)
+        page = reverse('posts:index')
+        self.assertNotEqual(
+            self.author.get(page)['ETag'], reader.get(page)['ETag']
+        )
+
+    def test_feed_validators_make_no_queries(self):
+        """Проверка свежести ленты не обращается к таблицам."""
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        )
+        guest = Client()
+        for page in pages:
+            with self.subTest(page=page):
+                etag = guest.get(page)['ETag']
+                with self.assertNumQueries(0):
+                    response = guest.get(page, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+
+    def test_follow_changes_profile_etag(self):
+        """Подписка меняет ETag профиля: на нём счётчики и кнопка."""
+        page = reverse(
+            'posts:profile', kwargs={'username': self.user.username}
+        )
+        reader = Client()
+        reader.force_login(self.reader)
+        etag = reader.get(page)['ETag']
+        reader.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.user.username}
+        ))
+        response = reader.get(page, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_stale_copy_has_no_validators(self):
+        """Старая копия ленты отдаётся без ETag текущей версии."""
+        page = reverse('posts:index')
+        guest = Client()
+        guest.get(page)
+        Post.objects.create(text='Новый пост', author=self.user)
+        # Новую версию страницы считает другой воркер.
+        request = RequestFactory().get(page)
+        request.user = AnonymousUser()
+        prefix = hashlib.md5(b'index').hexdigest()
+        lock = f'{get_cache_key(request, prefix)}.lock'
+        cache.add(lock, 1)
+        response = guest.get(page)
+        self.assertNotContains(response, 'Новый пост')
+        self.assertNotIn('ETag', response)
+        cache.delete(lock)
+        response = guest.get(page)
+        self.assertContains(response, 'Новый пост')
+        self.assertIn('ETag', response)
@@ -0,0 +1,91 @@
+"""Tests of denormalized counters."""
+
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Одна группа',
+            slug='test-slug',
+            description='Описание одной группы',
+        )
+        cls.group_another = Group.objects.create(
+            title='Другая группа',
+            slug='test-another_slug',
+            description='Описание другой группы',
+        )
+        cls.user = User.objects.create_user(username='WilliamBlake')
+        cls.reader = User.objects.create_user(username='Nobody')
+
+    def _stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counters_follow_writes(self):
+        """Счётчики постов автора и групп меняются при записи."""
+        post = Post.objects.create(
+            text='Просто текст', author=self.user, group=self.group
+        )
+        self.assertEqual(self._stats(self.user).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post.group = self.group_another
+        post.save()
+        self.group.refresh_from_db()
+        self.group_another.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.group_another.posts_count, 1)
+        post.delete()
+        self.group_another.refresh_from_db()
+        self.assertEqual(self.group_another.posts_count, 0)
+        self.assertEqual(self._stats(self.user).posts_count, 0)
+
+    def test_comment_and_follow_counters(self):
+        """Счётчики комментариев и подписок меняются при записи."""
+        post = Post.objects.create(text='Просто текст', author=self.user)
+        comment = Comment.objects.create(
+            text='Bingo!', author=self.reader, post=post
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(self._stats(self.user).followers_count, 1)
+        self.assertEqual(self._stats(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self._stats(self.user).followers_count, 0)
+        self.assertEqual(self._stats(self.reader).following_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет разошедшиеся счётчики."""
+        Post.objects.create(
+            text='Просто текст', author=self.user, group=self.group
+        )
+        Group.objects.filter(pk=self.group.pk).update(posts_count=42)
+        UserStats.objects.filter(user=self.user).delete()
+        call_command('recount', batch_size=1, stdout=StringIO())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self._stats(self.user).posts_count, 1)
+
+    def test_profile_without_stats(self):
+        """Профиль автора без строки статистики открывается."""
+        Post.objects.create(text='Просто текст', author=self.user)
+        UserStats.objects.filter(user=self.user).delete()
+        response = Client().get(
+            reverse('posts:profile', kwargs={'username': self.user.username})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
@@ -0,0 +1,46 @@
+"""Tests of the dataset generator."""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class GenerateDatasetTests(TestCase):
+    def generate(self, seed=0):
+        call_command(
+            'generate_dataset', posts=60, users=12, groups=3, comments=40,
+            follows_per_user=4, seed=seed, batch_size=25, stdout=StringIO(),
+        )
+        return list(Post.objects.order_by('pk').values_list(
+            'author_id', 'group_id', 'text', 'pub_date'
+        ))
+
+    def test_dataset_sizes_and_derived_data(self):
+        """Создаются все таблицы, счётчики, индекс и ленты."""
+        self.generate()
+        self.assertEqual(User.objects.count(), 12)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 40)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(
+            sum(User.objects.values_list('stats__posts_count', flat=True)),
+            60,
+        )
+        follows = Follow.objects.values_list('user_id', 'author_id')
+        self.assertFalse([pair for pair in follows if pair[0] == pair[1]])
+
+    def test_same_seed_same_data(self):
+        """Одинаковый seed даёт одинаковый набор, другой seed - другой."""
+        first = self.generate(seed=7)
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+        self.assertEqual(self.generate(seed=7), first)
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+        self.assertNotEqual(self.generate(seed=8), first)
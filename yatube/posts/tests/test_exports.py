@@ -0,0 +1,145 @@
+"""Tests of the NDJSON export."""
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+from http import HTTPStatus
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def read_records(lines):
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='WilliamBlake', is_staff=True
+        )
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Просто название группы',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        cls.post = Post.objects.create(
+            text='Simpliest text in the world',
+            author=cls.user,
+            group=cls.group,
+        )
+        Comment.objects.create(
+            text='Комментарий', post=cls.post, author=cls.reader
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def get_records(self, **params):
+        response = self.client.get(reverse('posts:api_export'), params)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        content = b''.join(response.streaming_content)
+        if params.get('gzip'):
+            content = gzip.decompress(content)
+        return read_records(content.decode().splitlines())
+
+    def test_export_streams_every_table(self):
+        """Выгрузка содержит все таблицы и заканчивается водяным знаком."""
+        for params in ({}, {'gzip': '1'}):
+            with self.subTest(params=params):
+                records = self.get_records(**params)
+                self.assertEqual(
+                    [record['type'] for record in records],
+                    ['group', 'post', 'comment', 'follow', 'watermark'],
+                )
+                self.assertEqual(records[1]['text'], self.post.text)
+
+    def test_incremental_export(self):
+        """С водяным знаком выгружаются только новые посты."""
+        watermark = self.get_records()[-1]['since']
+        post = Post.objects.create(text='Новый пост', author=self.user)
+        records = self.get_records(since=watermark)
+        self.assertEqual(
+            [r['id'] for r in records if r['type'] == 'post'], [post.pk]
+        )
+        self.assertFalse([r for r in records if r['type'] == 'comment'])
+
+    def test_export_needs_login(self):
+        """Анонимная выгрузка и кривой водяной знак отклоняются."""
+        url = reverse('posts:api_export')
+        self.assertEqual(
+            Client().get(url).status_code, HTTPStatus.UNAUTHORIZED
+        )
+        self.assertEqual(
+            self.client.get(url, {'since': 'вчера'}).status_code,
+            HTTPStatus.BAD_REQUEST,
+        )
+
+    def test_export_needs_staff(self):
+        """Обычному пользователю выгрузка запрещена."""
+        reader = Client()
+        reader.force_login(self.reader)
+        response = reader.get(reverse('posts:api_export'))
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+    def test_export_under_asgi(self):
+        """Через ASGI-обработчик выгрузка приходит целиком."""
+        cookie = settings.SESSION_COOKIE_NAME
+        session = self.client.cookies[cookie].value
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': reverse('posts:api_export'),
+            'query_string': b'',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'cookie', f'{cookie}={session}'.encode()),
+            ],
+            'client': ('127.0.0.1', 50000),
+            'server': ('testserver', 80),
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(ASGIHandler())(scope, receive, send)
+        self.assertEqual(messages[0]['status'], HTTPStatus.OK)
+        body = b''.join(message.get('body', b'') for message in messages)
+        records = read_records(body.decode().splitlines())
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['group', 'post', 'comment', 'follow', 'watermark'],
+        )
+
+    def test_export_command(self):
+        """Команда пишет ту же выгрузку в файл."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.ndjson.gz')
+            call_command(
+                'export_posts', output=path, gzip=True, stderr=StringIO()
+            )
+            with gzip.open(path, 'rt') as export:
+                records = read_records(export)
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[-1]['type'], 'watermark')
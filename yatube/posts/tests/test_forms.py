@@ -3,12 +3,16 @@
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import BytesIO, StringIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 from posts.models import Group, Post
 
 User = get_user_model()
@@ -110,3 +114,115 @@ class PostCreateFormTests(TestCase):
             exists()
         )
         self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    @override_settings(POSTS_THUMBNAILS={'MODE': 'inline'})
+    def test_thumbnails_are_generated_on_save(self):
+        '''Миниатюры готовятся при сохранении картинки.'''
+        self.uploaded.name = 'thumbnail_inline.gif'
+        self.author.post(
+            reverse('posts:post_create'),
+            data={'text': 'Текст с картинкой', 'image': self.uploaded},
+        )
+        post = Post.objects.latest('id')
+        self.assertTrue(post.thumbnails_ready)
+        response = self.author.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, f'{settings.MEDIA_URL}cache/')
+
+    @override_settings(POSTS_THUMBNAILS={'MODE': 'process'})
+    def test_pending_thumbnails_fall_back_to_original(self):
+        '''Пока миниатюры готовятся, показывается оригинал.'''
+        self.uploaded.name = 'thumbnail_pending.gif'
+        self.author.post(
+            reverse('posts:post_create'),
+            data={'text': 'Текст с картинкой', 'image': self.uploaded},
+        )
+        post = Post.objects.latest('id')
+        self.assertFalse(post.thumbnails_ready)
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        self.assertContains(self.author.get(url), post.image.url)
+        call_command(
+            'generate_thumbnails', once=True, workers=1, stdout=StringIO()
+        )
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnails_ready)
+
+    @override_settings(POSTS_THUMBNAILS={'MODE': 'process'})
+    def test_generated_thumbnails_reach_cached_feeds(self):
+        '''Готовые миниатюры сразу видны в закэшированных лентах.'''
+        cache.clear()
+        self.uploaded.name = 'thumbnail_feed.gif'
+        self.author.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Текст с картинкой',
+                'group': self.group.pk,
+                'image': self.uploaded,
+            },
+        )
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        )
+        for page in pages:
+            self.assertNotContains(
+                self.author.get(page), f'{settings.MEDIA_URL}cache/'
+            )
+        call_command(
+            'generate_thumbnails', once=True, workers=1, stdout=StringIO()
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertContains(
+                    self.author.get(page), f'{settings.MEDIA_URL}cache/'
+                )
+
+    @override_settings(POSTS_THUMBNAILS={'MODE': 'inline'})
+    def test_responsive_variants_are_rendered(self):
+        '''Для картинки готовятся варианты WebP и разметка srcset.'''
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 500), 'red').save(buffer, 'PNG')
+        uploaded = SimpleUploadedFile(
+            name='variants.png',
+            content=buffer.getvalue(),
+            content_type='image/png',
+        )
+        self.author.post(
+            reverse('posts:post_create'),
+            data={'text': 'Текст с картинкой', 'image': uploaded},
+        )
+        post = Post.objects.latest('id')
+        webp = [v for v in post.image_variants if v['format'] == 'webp']
+        self.assertEqual([v['width'] for v in webp], [320, 640, 960])
+        response = self.author.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, f"{webp[0]['name']} 320w")
+
+    @override_settings(POSTS_THUMBNAILS={'MODE': 'process'})
+    def test_variants_reach_cached_feeds(self):
+        '''Разметка srcset появляется в закэшированной ленте вместе с ETag.'''
+        cache.clear()
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 500), 'red').save(buffer, 'PNG')
+        uploaded = SimpleUploadedFile(
+            name='variants_feed.png',
+            content=buffer.getvalue(),
+            content_type='image/png',
+        )
+        self.author.post(
+            reverse('posts:post_create'),
+            data={'text': 'Текст с картинкой', 'image': uploaded},
+        )
+        page = reverse('posts:index')
+        before = self.author.get(page)
+        self.assertNotContains(before, '<source type="image/webp"')
+        call_command(
+            'generate_thumbnails', once=True, workers=1, stdout=StringIO()
+        )
+        after = self.author.get(page)
+        self.assertContains(after, '<source type="image/webp"')
+        self.assertNotEqual(before['ETag'], after['ETag'])
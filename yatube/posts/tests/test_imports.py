@@ -0,0 +1,83 @@
+"""Tests of the bulk import."""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ImportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='WilliamBlake')
+        cls.reader = User.objects.create_user(username='Reader')
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def run_import(self, *args, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'import_posts', *args, stdout=stdout, stderr=stderr, **options
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_ndjson_import(self):
+        """Строки NDJSON загружаются пачками, связи ищутся по ключам."""
+        rows = [
+            {'type': 'group', 'slug': 'poems', 'title': 'Стихи',
+             'description': 'Песни невинности'},
+            {'type': 'post', 'id': 100, 'author': 'WilliamBlake',
+             'group': 'poems', 'text': 'Tyger Tyger',
+             'pub_date': '1794-01-01T00:00:00+00:00'},
+            {'type': 'post', 'author_id': self.reader.pk, 'text': 'Ответ'},
+            {'type': 'comment', 'post_id': 100, 'author': 'Reader',
+             'text': 'Прекрасно'},
+            {'type': 'follow', 'user': 'Reader', 'author': 'WilliamBlake'},
+            {'type': 'watermark', 'since': '2026-01-01T00:00:00+00:00'},
+        ]
+        path = self.write('rows.ndjson', '\n'.join(map(json.dumps, rows)))
+        stdout, stderr = self.run_import(path, batch_size=1)
+        self.assertEqual(stderr, '')
+        self.assertIn('строк/с', stdout)
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.group.slug, 'poems')
+        self.assertEqual(post.pub_date.year, 1794)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.get().post, post)
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.user
+        ).exists())
+        # Счётчики пересчитаны после bulk_create.
+        self.assertEqual(Group.objects.get().posts_count, 1)
+        self.assertEqual(Post.objects.get(pk=100).comments_count, 1)
+
+    def test_csv_import_reports_bad_rows(self):
+        """Ошибочные строки CSV пропускаются и попадают в отчёт."""
+        path = self.write('posts.csv', (
+            'author,text,group\n'
+            'WilliamBlake,Первый пост,\n'
+            'Nobody,Без автора,\n'
+            'WilliamBlake,,\n'
+            'Reader,Без группы,missing\n'
+        ))
+        stdout, stderr = self.run_import(path)
+        self.assertEqual(Post.objects.get().text, 'Первый пост')
+        self.assertIn('Строка 3: unknown author', stderr)
+        self.assertIn('Строка 4: text:', stderr)
+        self.assertIn('Строка 5: unknown group', stderr)
+        self.assertIn('ошибок: 3', stdout)
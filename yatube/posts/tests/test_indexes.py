@@ -0,0 +1,71 @@
+"""Tests of feed query plans."""
+
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from posts.models import Follow, Group, Post
+from posts.paginators import CursorPaginator
+from posts.timelines import get_timeline
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite')
+class FeedIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='WilliamBlake')
+        cls.reader = User.objects.create_user(username='Nobody')
+        cls.group = Group.objects.create(
+            title='Просто название группы',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        cls.post = Post.objects.create(
+            text='Просто тестовый текст', author=cls.user, group=cls.group,
+        )
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(f'USING INDEX {index}', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_feeds_read_composite_indexes(self):
+        """Каждая лента читает свой составной индекс без сортировки."""
+        cursor_feed = CursorPaginator(Post.objects.all(), 10)
+        feeds = {
+            'index': (Post.objects.all(), 'post_date_idx'),
+            'cursor': (
+                cursor_feed._ordered(descending=True), 'post_date_idx'
+            ),
+            'group': (self.group.posts.all(), 'post_group_date_idx'),
+            'profile': (self.user.posts.all(), 'post_author_date_idx'),
+            'follow': (
+                get_timeline().feed(self.reader), 'timeline_user_date_idx'
+            ),
+            'comments': (self.post.comments.all(), 'comment_post_created_idx'),
+        }
+        for feed, (queryset, index) in feeds.items():
+            with self.subTest(feed=feed):
+                self.assertUsesIndex(queryset[:10], index)
+
+    def test_follow_lookup_is_index_probe(self):
+        """Проверка подписки ищет по уникальному индексу."""
+        plan = Follow.objects.filter(
+            user=self.reader, author=self.user
+        ).explain()
+        self.assertIn('INDEX', plan)
+        self.assertNotIn('SCAN', plan)
+
+
+class FollowUniqueTests(TestCase):
+    def test_follow_is_unique(self):
+        """Повторная подписка на автора запрещена."""
+        user = User.objects.create_user(username='WilliamBlake')
+        reader = User.objects.create_user(username='Nobody')
+        Follow.objects.create(user=reader, author=user)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=reader, author=user)
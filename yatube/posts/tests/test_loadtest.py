@@ -0,0 +1,50 @@
+"""Tests of the load generator."""
+
+from django.contrib.auth import get_user_model
+from django.test import LiveServerTestCase, SimpleTestCase
+from posts.loadtest import LoadTest, Targets, parse_mix
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ParseMixTests(SimpleTestCase):
+    def test_weights(self):
+        """Смесь разбирается в веса, вес по умолчанию - единица."""
+        self.assertEqual(
+            parse_mix('browse=70,post'), {'browse': 70.0, 'post': 1.0}
+        )
+
+    def test_unknown_scenario(self):
+        """Неизвестный сценарий - ошибка."""
+        with self.assertRaises(ValueError):
+            parse_mix('browse=1,delete=1')
+
+
+class LoadTestTests(LiveServerTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            text='Пост', author=self.author, group=group
+        )
+
+    def test_run(self):
+        """Все сценарии проходят без ошибок и попадают в отчёт."""
+        # С этим зерном все сценарии выпадают в первых же итерациях,
+        # и отчёт не зависит от скорости сервера.
+        stats = LoadTest(
+            self.live_server_url, Targets(), clients=1, duration=1, seed=1,
+            mix={'browse': 1, 'follow': 1, 'comment': 1, 'post': 1},
+        ).run()
+        self.assertGreater(stats['requests'], 0)
+        self.assertEqual(stats['error_rate'], 0)
+        self.assertEqual(
+            set(stats['kinds']), {'browse', 'follow', 'comment', 'post'}
+        )
+        self.assertTrue(Comment.objects.filter(post=self.post).exists())
+        self.assertTrue(Post.objects.filter(author=self.reader).exists())
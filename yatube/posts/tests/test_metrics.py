@@ -0,0 +1,83 @@
+"""Tests of the Prometheus metrics."""
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post
+from prometheus_client import REGISTRY
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='WilliamBlake')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_are_counted_per_view(self):
+        """Запросы, время и число запросов к базе считаются по имени URL."""
+        labels = {'view': 'posts:index', 'method': 'GET', 'status': '200'}
+        requests = self.sample('yatube_requests_total', **labels)
+        misses = self.sample(
+            'yatube_cache_events_total', cache='feed', event='misses'
+        )
+        self.client.get(reverse('posts:index'))
+        self.client.get('/no-such-page/')
+        self.assertEqual(
+            self.sample('yatube_requests_total', **labels), requests + 1
+        )
+        self.assertEqual(
+            self.sample(
+                'yatube_cache_events_total', cache='feed', event='misses'
+            ),
+            misses + 1,
+        )
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        body = response.content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket{le="0.1",'
+            'view="posts:index"}', body
+        )
+        self.assertIn(
+            'yatube_request_db_queries_count{view="posts:index"}', body
+        )
+        self.assertIn(
+            'yatube_requests_total{method="GET",status="404",'
+            'view="unmatched"}', body
+        )
+
+    def test_metrics_are_internal(self):
+        """Метрики отдаются только разрешённым адресам."""
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.1.1.1')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+    @override_settings(METRICS={'TOKEN': 'secret'})
+    def test_metrics_token(self):
+        """С токеном метрики отдаются только по нему, адрес не важен."""
+        url = reverse('metrics')
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.FORBIDDEN
+        )
+        for header in ('Bearer wrong', 'Bearer секрет'):
+            with self.subTest(header=header):
+                self.assertEqual(
+                    self.client.get(
+                        url, HTTP_AUTHORIZATION=header
+                    ).status_code,
+                    HTTPStatus.FORBIDDEN,
+                )
+        response = self.client.get(
+            url, REMOTE_ADDR='10.1.1.1', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
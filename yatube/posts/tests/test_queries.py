@@ -0,0 +1,90 @@
+"""Tests of query budgets of the views."""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Запросов на страницу при любом числе постов и комментариев,
+# включая запрос валидаторов условного GET поста (ленты проверяются
+# по поколениям кэша, без запросов).
+QUERY_BUDGETS = {
+    'posts:index': 5,
+    'posts:group_list': 5,
+    'posts:profile': 6,
+    'posts:post_detail': 5,
+    'posts:follow_index': 6,
+}
+
+
+# Фоновые задачи выполняются сразу, без воркеров.
+@override_settings(TASKS={'BROKER': 'core.tasks.ImmediateBroker'})
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Просто название группы',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        cls.user = User.objects.create_user(username='WilliamBlake')
+        cls.reader = User.objects.create_user(username='Nobody')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        cls.post = cls._add_posts(1)
+
+    @classmethod
+    def _add_posts(cls, number):
+        for i in range(number):
+            author = User.objects.create_user(username=f'author_{i}_{number}')
+            Follow.objects.get_or_create(user=cls.reader, author=author)
+            post = Post.objects.create(
+                text=f'Просто тестовый текст #{i}',
+                author=author if i % 2 else cls.user,
+                group=cls.group,
+            )
+            Comment.objects.create(text='Bingo!', author=author, post=post)
+        return post
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def _count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def _urls(self):
+        return {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list':
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            'posts:profile':
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            'posts:post_detail':
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            'posts:follow_index': reverse('posts:follow_index'),
+        }
+
+    def test_views_fit_query_budget(self):
+        """Число запросов страницы не зависит от числа постов."""
+        few = {name: self._count_queries(url)
+               for name, url in self._urls().items()}
+        self._add_posts(12)
+        for i in range(12):
+            Comment.objects.create(
+                text=f'Комментарий #{i}', author=self.reader, post=self.post
+            )
+        for name, url in self._urls().items():
+            with self.subTest(view=name):
+                many = self._count_queries(url)
+                self.assertEqual(many, few[name])
+                self.assertLessEqual(many, QUERY_BUDGETS[name])
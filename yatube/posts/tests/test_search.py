@@ -0,0 +1,91 @@
+"""Tests of the full-text search."""
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post
+from posts.search import LikeSearch, get_search
+
+User = get_user_model()
+
+
+# Фоновые задачи выполняются сразу, без воркеров.
+@override_settings(TASKS={'BROKER': 'core.tasks.ImmediateBroker'})
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='WilliamBlake')
+        cls.tiger = Post.objects.create(
+            text='Тигр, тигр, жгучий страх, ты горишь в ночных лесах',
+            author=cls.user,
+        )
+        cls.lamb = Post.objects.create(
+            text='Little Lamb, who made thee? Тигр где-то рядом',
+            author=cls.user,
+        )
+        Post.objects.create(text='Совсем другой пост', author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return list(response.context['page_obj'])
+
+    def test_search_ranks_by_relevance(self):
+        """Поиск находит посты по словам и ставит лучшие выше."""
+        self.assertEqual(self.search('тигр'), [self.tiger, self.lamb])
+        self.assertEqual(self.search('LAMB'), [self.lamb])
+        self.assertEqual(self.search('тигр!!! "('), [self.tiger, self.lamb])
+        self.assertEqual(self.search(''), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        """Правка и удаление поста сразу видны в поиске."""
+        lamb = Post.objects.get(pk=self.lamb.pk)
+        lamb.text = 'Ягнёнок'
+        lamb.save()
+        self.assertEqual(self.search('тигр'), [self.tiger])
+        Post.objects.get(pk=self.tiger.pk).delete()
+        self.assertEqual(self.search('тигр'), [])
+
+    def test_pages_keep_the_query(self):
+        """Ссылки паджинатора сохраняют поисковый запрос."""
+        Post.objects.bulk_create(
+            Post(text=f'Тигр #{i}', author=self.user) for i in range(15)
+        )
+        get_search().rebuild()
+        response = self.client.get(reverse('posts:search'), {'q': 'тигр'})
+        self.assertContains(response, 'href="?q=%D1%82%D0%B8%D0%B3%D1%80&')
+
+    def test_rebuild_command(self):
+        """Команда заново индексирует все посты."""
+        get_search().clear()
+        self.assertEqual(self.search('тигр'), [])
+        call_command('rebuild_search_index', batch_size=2, stdout=StringIO())
+        self.assertEqual(self.search('тигр'), [self.tiger, self.lamb])
+
+    def test_admin_search(self):
+        """Поиск в админке идёт по индексу."""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'lamb'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.lamb]
+        )
+
+    def test_fallback_without_fts(self):
+        """На другой СУБД поиск идёт без таблицы FTS5."""
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            self.assertIsInstance(get_search(), LikeSearch)
+            post = Post.objects.create(text='Тигр в клетке', author=self.user)
+            self.assertEqual(self.search('клетке'), [post])
+            self.assertEqual(self.search('lamb'), [self.lamb])
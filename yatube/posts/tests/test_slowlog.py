@@ -0,0 +1,77 @@
+"""Tests of the slow query log."""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from core.slowlog import fingerprint, normalize
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post
+
+User = get_user_model()
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_literals_are_collapsed(self):
+        """Запросы, различающиеся только значениями, имеют один отпечаток."""
+        self.assertEqual(
+            normalize("SELECT * FROM t WHERE a = 'x' AND id IN (%s, %s)"),
+            'SELECT * FROM t WHERE a = ? AND id IN (...)',
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (1, 2, 3) LIMIT 10'),
+            fingerprint('SELECT  *  FROM t WHERE id IN (4) LIMIT 20'),
+        )
+
+
+class SlowLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='WilliamBlake')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log_file = os.path.join(directory.name, 'slow.log')
+        settings = override_settings(SLOW_QUERIES={
+            'THRESHOLD_MS': 0,
+            'EXPLAIN_SAMPLE_RATE': 1,
+            'LOG_FILE': self.log_file,
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_slow_queries_are_logged_with_context(self):
+        """В журнал попадают отпечаток, страница, место вызова и план."""
+        with self.assertLogs('core.slowlog', 'WARNING'):
+            self.client.get(
+                reverse('posts:profile', args=[self.user.username])
+            )
+        with open(self.log_file, encoding='utf-8') as log:
+            entries = [json.loads(line) for line in log]
+        post_queries = [
+            entry for entry in entries
+            if 'FROM "posts_post"' in entry['sql']
+            and entry['sql'].startswith('SELECT')
+        ]
+        self.assertTrue(post_queries)
+        entry = post_queries[0]
+        self.assertEqual(entry['view'], 'posts:profile')
+        self.assertTrue(entry['frame'].startswith('posts'))
+        self.assertTrue(entry['plan'])
+
+    def test_command_shows_top_fingerprints(self):
+        """Команда сводит журнал по отпечаткам."""
+        with self.assertLogs('core.slowlog', 'WARNING'):
+            for _ in range(3):
+                list(Post.objects.filter(text='x'))
+        stdout = StringIO()
+        call_command('slow_queries', top=1, sort='count', stdout=stdout)
+        output = stdout.getvalue()
+        self.assertIn('3 раз', output)
+        self.assertIn('"posts_post"."text" = ?', output)
@@ -0,0 +1,169 @@
+"""Tests of the background task queue."""
+
+import threading
+from datetime import timedelta
+
+from core.models import Task
+from core.tasks import (
+    DatabaseBroker, ImmediateBroker, LocalBroker, Worker, enqueue, task
+)
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from posts import tasks
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+calls = []
+done = threading.Event()
+
+
+@task(retries=1)
+def flaky(fail_times):
+    """Fail the first ``fail_times`` calls."""
+    calls.append(fail_times)
+    if calls.count(fail_times) <= fail_times:
+        raise RuntimeError('flaky')
+    done.set()
+
+
+def broker(name):
+    return override_settings(TASKS={
+        'BROKER': f'core.tasks.{name}', 'BACKOFF': 0,
+    })
+
+
+class DatabaseBrokerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        calls.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    @broker('DatabaseBroker')
+    def test_post_create_enqueues(self):
+        """Новый пост раскладывается по лентам только воркером."""
+        self.client.post(reverse('posts:post_create'), {'text': 'Текст'})
+        post = Post.objects.get()
+        self.assertEqual(
+            set(Task.objects.values_list('name', flat=True)),
+            {tasks.push_to_timelines.task_name, tasks.index_post.task_name},
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+        Worker().run_pending()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(
+            dict(Task.objects.values_list('name', 'status')), {
+                tasks.push_to_timelines.task_name: Task.DONE,
+                tasks.index_post.task_name: Task.DONE,
+                # Обрезка лент ждёт конца интервала.
+                tasks.trim_timelines.task_name: Task.PENDING,
+            },
+        )
+
+    @broker('DatabaseBroker')
+    def test_idempotency_key(self):
+        """Задача с уже известным ключом повторно не ставится."""
+        self.assertTrue(enqueue(flaky, 0, key='once'))
+        self.assertFalse(enqueue(flaky, 0, key='once'))
+        Worker().run_pending()
+        self.assertFalse(enqueue(flaky, 0, key='once'))
+        self.assertEqual(calls, [0])
+
+    @broker('DatabaseBroker')
+    def test_failed_task_frees_its_key(self):
+        """Упавшая задача не занимает свой ключ навсегда."""
+        enqueue(flaky, 5, key='retry')
+        Worker().run_pending()
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+        self.assertTrue(enqueue(flaky, 0, key='retry'))
+        item = Task.objects.get()
+        self.assertEqual((item.status, item.attempts), (Task.PENDING, 0))
+        Worker().run_pending()
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+
+    def test_follow_feed_after_worker(self):
+        """С брокером по умолчанию лента подписок обновляется воркером."""
+        cache.clear()
+        reader = Client()
+        reader.force_login(self.reader)
+        feed = reverse('posts:follow_index')
+        self.assertNotContains(reader.get(feed), 'Новый пост')
+        self.client.post(reverse('posts:post_create'), {'text': 'Новый пост'})
+        self.assertNotContains(reader.get(feed), 'Новый пост')
+        Worker().run_pending()
+        self.assertContains(reader.get(feed), 'Новый пост')
+
+    @broker('DatabaseBroker')
+    def test_retries(self):
+        """Упавшая задача повторяется, пока не кончатся попытки."""
+        enqueue(flaky, 1)
+        enqueue(flaky, 5)
+        Worker().run_pending()
+        statuses = {
+            args[0]: status
+            for args, status in Task.objects.values_list('args', 'status')
+        }
+        self.assertEqual(statuses, {1: Task.DONE, 5: Task.FAILED})
+        failed = Task.objects.get(status=Task.FAILED)
+        self.assertEqual(failed.attempts, 2)
+        self.assertIn('flaky', failed.last_error)
+
+    @broker('DatabaseBroker')
+    def test_delay_and_reclaim(self):
+        """Отложенная задача ждёт; задача упавшего воркера возвращается."""
+        enqueue(flaky, 0, delay=60)
+        self.assertEqual(Worker().run_pending(), 0)
+        Task.objects.update(
+            status=Task.RUNNING, run_at=timezone.now(),
+            locked_until=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(Worker().reclaim(), 1)
+        self.assertEqual(Worker().run_pending(), 1)
+
+    def test_unknown_task(self):
+        """Ставить в очередь можно только задачи."""
+        with self.assertRaises(ValueError):
+            DatabaseBroker().enqueue('posts.models.Post', [], {})
+
+
+class ProcessBrokerTests(SimpleTestCase):
+    def setUp(self):
+        calls.clear()
+        done.clear()
+
+    @broker('ImmediateBroker')
+    def test_immediate_retries(self):
+        """Немедленный брокер повторяет задачу сразу."""
+        ImmediateBroker().enqueue(flaky.task_name, [1], {})
+        self.assertEqual(calls, [1, 1])
+
+    @broker('LocalBroker')
+    def test_local_retries(self):
+        """Задача выполняется в фоне и повторяется после ошибки."""
+        LocalBroker().enqueue(flaky.task_name, [1], {})
+        self.assertTrue(done.wait(5))
+        self.assertEqual(calls, [1, 1])
+
+    @broker('LocalBroker')
+    def test_local_duplicate_key(self):
+        """Локальный брокер сообщает о задаче, уже ждущей с тем же ключом."""
+        key = 'test:local-duplicate'
+        self.addCleanup(LocalBroker.get_scheduler().remove_job, key)
+        self.assertTrue(
+            LocalBroker().enqueue(flaky.task_name, [1], {}, key, 60)
+        )
+        self.assertFalse(
+            LocalBroker().enqueue(flaky.task_name, [1], {}, key, 60)
+        )
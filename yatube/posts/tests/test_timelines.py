@@ -0,0 +1,136 @@
+"""Tests of materialized follow feeds."""
+
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Follow, Post, TimelineEntry
+from posts.timelines import get_timeline
+
+User = get_user_model()
+
+
+# Фоновые задачи выполняются сразу, без воркеров.
+@override_settings(TASKS={'BROKER': 'core.tasks.ImmediateBroker'})
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='WilliamBlake')
+        cls.reader = User.objects.create_user(username='Nobody')
+        cls.stranger = User.objects.create_user(username='ColeWilson')
+
+    def setUp(self):
+        # Число постов ленты кэшируется пагинатором.
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def _feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост раскладывается только в ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Tyger Tyger', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.stranger).exists()
+        )
+        self.assertEqual(self._feed(), [post])
+
+    def test_unfollow_cleans_timeline(self):
+        """После отписки посты автора пропадают из ленты."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(text='Tyger Tyger', author=self.author)
+        follow.delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        self.assertEqual(self._feed(), [])
+
+    @override_settings(POSTS_TIMELINE={'MAX_LENGTH': 2})
+    def test_timeline_is_trimmed(self):
+        """Лента не длиннее MAX_LENGTH записей."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(4):
+            Post.objects.create(text=f'Текст #{i}', author=self.author)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+
+    @override_settings(POSTS_TIMELINE={'MAX_LENGTH': 2})
+    def test_trim_is_batched(self):
+        """Раскладка не обрезает ленты, их обрезает отдельная задача."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        Post.objects.bulk_create(
+            Post(text=f'Текст #{i}', author=self.author) for i in range(3)
+        )
+        timeline = get_timeline()
+        for post in Post.objects.filter(author=self.author):
+            timeline.push(post)
+        self.assertEqual(TimelineEntry.objects.count(), 6)
+        self.assertEqual(timeline.trim_all(), 2)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+
+    @override_settings(POSTS_TIMELINE={'MAX_LENGTH': 2})
+    def test_push_queries_do_not_grow_with_followers(self):
+        """Число запросов раскладки не зависит от числа подписчиков."""
+        post = Post.objects.create(text='Tyger Tyger', author=self.author)
+        timeline = get_timeline()
+
+        def count_push():
+            TimelineEntry.objects.all().delete()
+            with CaptureQueriesContext(connection) as queries:
+                timeline.push(post)
+            return len(queries)
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        few = count_push()
+        for i in range(5):
+            Follow.objects.create(
+                user=User.objects.create_user(username=f'reader_{i}'),
+                author=self.author,
+            )
+        self.assertEqual(count_push(), few)
+        self.assertEqual(TimelineEntry.objects.count(), 6)
+
+    @override_settings(POSTS_TIMELINE={'FANOUT_THRESHOLD': 0})
+    def test_heavy_author_is_read_on_demand(self):
+        """Посты популярных авторов подмешиваются при чтении."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Tyger Tyger', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self._feed(), [post])
+
+    def test_backfill_rebuilds_timelines(self):
+        """Команда backfill_timelines восстанавливает ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Tyger Tyger', author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('backfill_timelines', stdout=StringIO())
+        self.assertEqual(self._feed(), [post])
+
+    def test_migration_backfills_timelines(self):
+        """Миграция заполняет ленты подписок, сделанных до лент."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Tyger Tyger', author=self.author)
+        TimelineEntry.objects.all().delete()
+        backfill = import_module(
+            'posts.migrations.0021_backfill_timelines'
+        ).backfill_timelines
+        backfill(apps, None)
+        self.assertEqual(self._feed(), [post])
@@ -0,0 +1,68 @@
+"""Tests of the Server-Timing middleware."""
+import asyncio
+import json
+import re
+
+from asgiref.sync import async_to_sync, sync_to_async
+from core.middleware import ServerTimingMiddleware
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='WilliamBlake')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(SERVER_TIMING={'HEADER': True})
+    def test_header_and_log(self):
+        """Ответ несёт Server-Timing, а в лог уходит JSON-строка."""
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            response = self.client.get(reverse('posts:index'))
+            cached = self.client.get(reverse('posts:index'))
+        header = response['Server-Timing']
+        queries = int(re.search(r'desc="(\d+) queries"', header).group(1))
+        self.assertGreater(queries, 0)
+        self.assertRegex(header, r'tpl;dur=[1-9\d]*\.\d')
+        self.assertIn('0 hits, 1 misses', header)
+        self.assertIn('1 hits, 0 misses', cached['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['db_queries'], queries)
+
+    @override_settings(SERVER_TIMING={'SAMPLE_RATE': 0})
+    def test_unsampled_requests_are_not_measured(self):
+        """Запросы вне выборки не измеряются."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_no_header_by_default(self):
+        """Без DEBUG заголовок не отдаётся, а замеры идут в лог."""
+        with self.assertLogs('core.timing', 'INFO'):
+            response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(SERVER_TIMING={'HEADER': True})
+    def test_async_chain(self):
+        """Под ASGI middleware асинхронный и считает запросы из потоков."""
+        async def get_response(request):
+            await sync_to_async(Post.objects.count)()
+            return HttpResponse()
+
+        middleware = ServerTimingMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        with self.assertLogs('core.timing', 'INFO'):
+            response = async_to_sync(middleware)(RequestFactory().get('/'))
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
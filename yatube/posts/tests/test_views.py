@@ -1,11 +1,15 @@
 """Tests of post views."""
 
+from unittest import mock
+
 from django import forms
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.db import connection
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from posts.models import Comment, Group, Post
+from posts.paginators import EstimatedCountPaginator
 
 User = get_user_model()
 
@@ -59,6 +63,138 @@ class PaginatorViewsTest(TestCase):
         '''Пажинатор на последней странице'''
         self._test_paginator(NUMBER_OF_POSTS - POSTS_PER_PAGE, '?page=2')
 
+    @mock.patch('posts.views.POSTS_PER_PAGE', 1)
+    def test_page_range_is_elided(self):
+        '''Пажинатор показывает только края и соседей текущей страницы'''
+        cache.clear()
+        response = self.guest_client.get(reverse('posts:index') + '?page=7')
+        ellipsis = response.context['paginator'].ELLIPSIS
+        self.assertEqual(
+            list(response.context['page_range']),
+            [1, ellipsis, 5, 6, 7, 8, 9, ellipsis, NUMBER_OF_POSTS],
+        )
+        self.assertContains(response, 'page-link', count=13)
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='WilliamBlake')
+        for i in range(NUMBER_OF_POSTS):
+            Post.objects.create(
+                text=f'Просто тестовый текст #{i}', author=cls.user,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_big_hint_replaces_count(self):
+        """Большая подсказка используется без COUNT(*)."""
+        paginator = EstimatedCountPaginator(
+            Post.objects.all(), POSTS_PER_PAGE, count_hint=5000
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.count, 5000)
+
+    def test_small_hint_falls_back_to_exact_count(self):
+        """Маленькие выборки считаются точно."""
+        paginator = EstimatedCountPaginator(
+            Post.objects.all(), POSTS_PER_PAGE, count_hint=3
+        )
+        self.assertEqual(paginator.count, NUMBER_OF_POSTS)
+
+    def test_count_without_estimate_is_cached(self):
+        """Без оценки точное число берётся из кэша."""
+        queryset = Post.objects.filter(author=self.user)
+        EstimatedCountPaginator(queryset, POSTS_PER_PAGE).count
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                EstimatedCountPaginator(queryset, POSTS_PER_PAGE).count,
+                NUMBER_OF_POSTS,
+            )
+
+    def test_stale_statistics_do_not_cap_pages(self):
+        """Устаревшая статистика не прячет страницы за оценкой."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.bulk_create(
+            Post(text=f'Новый текст #{i}', author=self.user)
+            for i in range(POSTS_PER_PAGE * 2)
+        )
+        paginator = EstimatedCountPaginator(
+            Post.objects.all(), POSTS_PER_PAGE, exact_threshold=1
+        )
+        self.assertEqual(paginator.num_pages, 2)
+        page = paginator.get_page(4)
+        self.assertEqual(page.number, 4)
+        self.assertEqual(len(page), NUMBER_OF_POSTS - POSTS_PER_PAGE)
+        self.assertEqual(
+            paginator.count, NUMBER_OF_POSTS + POSTS_PER_PAGE * 2
+        )
+
+    def test_last_estimated_page_links_further(self):
+        """С последней по оценке страницы есть ссылка на следующую."""
+        paginator = EstimatedCountPaginator(
+            Post.objects.all(), POSTS_PER_PAGE,
+            count_hint=POSTS_PER_PAGE, exact_threshold=1,
+        )
+        self.assertTrue(paginator.get_page(1).has_next())
+
+
+@override_settings(POSTS_PAGINATION={'default': 'cursor'})
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Просто название',
+            slug='test-slug',
+            description='Описание простого поста',
+        )
+        cls.user = User.objects.create_user(username='WilliamBlake')
+        for i in range(NUMBER_OF_POSTS):
+            Post.objects.create(
+                text=f'Просто тестовый текст #{i}',
+                author=cls.user,
+                group=cls.group,
+            )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_cursor_walks_feed_forth_and_back(self):
+        """Курсоры ведут на следующую и обратно на первую страницу."""
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url).context['page_obj']
+                self.assertEqual(len(first), POSTS_PER_PAGE)
+                self.assertFalse(first.has_previous())
+                second = self.guest_client.get(
+                    url, {'cursor': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    len(second), NUMBER_OF_POSTS - POSTS_PER_PAGE
+                )
+                self.assertFalse(second.has_next())
+                back = self.guest_client.get(
+                    url, {'cursor': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+
+    def test_broken_cursor_shows_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(len(response.context['page_obj']), POSTS_PER_PAGE)
+
 
 class PostViewsTest(TestCase):
     @classmethod
@@ -0,0 +1,111 @@
+"""Thumbnail pre-generation for post images.
+
+A saved image is marked pending, and every configured geometry together
+with the responsive variants of ``posts.images`` is rendered outside the
+request: inline, by an in-process thread pool, as a task of the
+``core.tasks`` queue or by a separate ``manage.py generate_thumbnails``
+worker. Templates show the original
+image while the job is pending.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from core import tasks
+from core.metrics import THUMBNAIL_SECONDS
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+
+from posts.caching import invalidate
+from posts.images import make_variants
+from posts.models import Post
+from posts.signals import feed_scopes
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MODE': 'thread',
+    'WORKERS': 2,
+    'GEOMETRIES': [('960x339', {'crop': 'center', 'upscale': True})],
+}
+
+_pool = None
+
+
+def get_option(name):
+    return getattr(settings, 'POSTS_THUMBNAILS', {}).get(name, DEFAULTS[name])
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=get_option('WORKERS'),
+            thread_name_prefix='thumbnails',
+        )
+    return _pool
+
+
+@tasks.task(retries=1)
+@THUMBNAIL_SECONDS.time()
+def generate(post_id):
+    """Render every geometry of a post image and mark it ready."""
+    post = Post.objects.filter(pk=post_id).only(
+        'image', 'author_id', 'group_id'
+    ).first()
+    if post is None or not post.image:
+        return False
+    for geometry, options in get_option('GEOMETRIES'):
+        get_thumbnail(post.image, geometry, **options)
+    variants = make_variants(post)
+    # The image may have been replaced while we were rendering.
+    updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnails_ready=True, image_variants=variants,
+        updated=timezone.now(),
+    )
+    # update() sends no signals: cached feeds still show the original.
+    if updated:
+        invalidate(*feed_scopes(
+            author_ids=[post.author_id], group_ids=[post.group_id]
+        ))
+    return True
+
+
+def run_job(post_id):
+    """Generate thumbnails in a worker thread, logging failures."""
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception('Thumbnails of post %s failed', post_id)
+    finally:
+        close_old_connections()
+
+
+def reset(post):
+    """Mark thumbnails and variants of a new image as pending."""
+    post.thumbnails_ready = not post.image
+    post.image_variants = []
+
+
+def enqueue(post):
+    """Schedule thumbnails of a post saved with a new image."""
+    if post.thumbnails_ready:
+        return
+    mode = get_option('MODE')
+    if mode == 'inline':
+        generate(post.pk)
+    elif mode == 'thread':
+        transaction.on_commit(
+            lambda: get_pool().submit(run_job, post.pk)
+        )
+    elif mode == 'queue':
+        tasks.enqueue(
+            generate, post.pk, key=f'thumbnails:{post.pk}:{post.image.name}'
+        )
+    # 'process': pending posts are picked up by generate_thumbnails.
+
+
+def pending():
+    """Posts waiting for their thumbnails."""
+    return Post.objects.filter(thumbnails_ready=False).exclude(image='')
@@ -0,0 +1,170 @@
+"""Materialized follow feeds.
+
+New posts are pushed into the timeline of every follower when they are
+published (fan-out on write), so ``follow_index`` reads one indexed range
+instead of sorting all posts of all followed authors. Authors with more
+followers than ``FANOUT_THRESHOLD`` are not pushed: their posts are mixed
+into the feed on read.
+
+A push doesn't trim the timelines it grows: timelines longer than
+``MAX_LENGTH`` are cut in batches at most once per ``TRIM_INTERVAL``
+seconds (``posts.tasks.trim_timelines``), so the cost of a post doesn't
+depend on the length of its followers' timelines.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils.module_loading import import_string
+
+from posts.models import Follow, Post, TimelineEntry, UserStats
+
+DEFAULTS = {
+    'BACKEND': 'posts.timelines.DatabaseTimeline',
+    'MAX_LENGTH': 800,
+    'FANOUT_THRESHOLD': 1000,
+    'TRIM_INTERVAL': 300,
+}
+
+
+def get_option(name):
+    return getattr(settings, 'POSTS_TIMELINE', {}).get(name, DEFAULTS[name])
+
+
+def get_timeline():
+    """Return the configured timeline backend."""
+    return import_string(get_option('BACKEND'))()
+
+
+class BaseTimeline:
+    """Interface of a timeline store."""
+
+    def __init__(self):
+        self.max_length = get_option('MAX_LENGTH')
+        self.fanout_threshold = get_option('FANOUT_THRESHOLD')
+
+    def push(self, post):
+        """Deliver a new post to the followers of its author."""
+        raise NotImplementedError
+
+    def follow(self, user_id, author_id):
+        """Fill a timeline with the posts of a newly followed author."""
+        raise NotImplementedError
+
+    def unfollow(self, user_id, author_id):
+        """Drop the posts of an unfollowed author from a timeline."""
+        raise NotImplementedError
+
+    def rebuild(self, user_id):
+        """Recreate a timeline from scratch."""
+        raise NotImplementedError
+
+    def trim_all(self):
+        """Cut every timeline to MAX_LENGTH entries, return how many."""
+        raise NotImplementedError
+
+    def feed(self, user):
+        """Return the queryset of posts for the follow feed."""
+        raise NotImplementedError
+
+    def heavy_authors(self, user_id):
+        """Return ids of followed authors that are read on demand."""
+        return list(UserStats.objects.filter(
+            user__following__user_id=user_id,
+            followers_count__gt=self.fanout_threshold,
+        ).values_list('user_id', flat=True))
+
+    def is_heavy(self, author_id):
+        return UserStats.objects.filter(
+            pk=author_id, followers_count__gt=self.fanout_threshold
+        ).exists()
+
+
+class DatabaseTimeline(BaseTimeline):
+    """Timeline kept in the ``TimelineEntry`` table."""
+
+    def push(self, post):
+        if self.is_heavy(post.author_id):
+            return
+        followers = Follow.objects.filter(author_id=post.author_id)
+        entries = [
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.values_list('user_id', flat=True)
+        ]
+        TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+    def follow(self, user_id, author_id):
+        if self.is_heavy(author_id):
+            return
+        posts = Post.objects.filter(author_id=author_id)
+        self._fill(user_id, posts)
+        self.trim([user_id])
+
+    def unfollow(self, user_id, author_id):
+        TimelineEntry.objects.filter(
+            user_id=user_id, post__author_id=author_id
+        ).delete()
+
+    def rebuild(self, user_id):
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        heavy = self.heavy_authors(user_id)
+        followed = Follow.objects.filter(user_id=user_id).exclude(
+            author_id__in=heavy
+        ).values('author_id')
+        self._fill(user_id, Post.objects.filter(author_id__in=followed))
+
+    def trim(self, user_ids):
+        """Keep only the newest MAX_LENGTH entries of the timelines.
+
+        ``user_ids`` is a list or a ``values('user_id')`` queryset; all
+        the timelines are trimmed by one DELETE.
+        """
+        ranked = TimelineEntry.objects.filter(
+            user_id__in=user_ids
+        ).annotate(position=Window(
+            RowNumber(),
+            partition_by=[F('user_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        )).values('id', 'position')
+        sql, params = ranked.query.sql_with_params()
+        table = TimelineEntry._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE id IN ('
+                f'SELECT id FROM ({sql}) ranked WHERE position > %s)',
+                (*params, self.max_length),
+            )
+
+    def trim_all(self, batch_size=100):
+        user_ids = list(TimelineEntry.objects.order_by().values(
+            'user_id'
+        ).annotate(entries=Count('id')).filter(
+            entries__gt=self.max_length
+        ).values_list('user_id', flat=True))
+        for start in range(0, len(user_ids), batch_size):
+            self.trim(user_ids[start:start + batch_size])
+        return len(user_ids)
+
+    def feed(self, user):
+        heavy = self.heavy_authors(user.id)
+        if not heavy:
+            # Ordered by the entry date to read the timeline index range.
+            return Post.objects.filter(
+                timeline_entries__user=user
+            ).order_by('-timeline_entries__pub_date')
+        delivered = TimelineEntry.objects.filter(user=user).values('post_id')
+        return Post.objects.filter(
+            Q(pk__in=delivered) | Q(author_id__in=heavy)
+        )
+
+    def _fill(self, user_id, posts):
+        newest = posts.order_by('-pub_date').values_list(
+            'id', 'pub_date'
+        )[:self.max_length]
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+                for pk, pub_date in newest
+            ],
+            ignore_conflicts=True,
+        )
@@ -1,18 +1,22 @@
 """Post's pathes."""
+from django.conf import settings
 from django.urls import path
 
-from . import views
-from . views import get_post
+from . import async_views, views
 
 app_name = 'posts'
 
+# Ленты и API поста: асинхронные версии под ASGI.
+feeds = async_views if settings.POSTS_ASYNC_VIEWS else views
+
 urlpatterns = [
-    path('', views.index, name='index'),
-    path('group/<slug>/', views.group_posts, name='group_list'),
+    path('', feeds.index, name='index'),
+    path('group/<slug>/', feeds.group_posts, name='group_list'),
+    path('search/', views.search, name='search'),
     # Профайл пользователя
-    path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/', feeds.profile, name='profile'),
     # Просмотр записи
-    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('posts/<int:post_id>/', feeds.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
@@ -29,5 +33,22 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
-    path('api/v1/posts/<int:pk>/', views.get_post, name='get_post'),
+    path('api/v1/posts/', views.api_posts, name='api_posts'),
+    path('api/v1/posts/<int:pk>/', feeds.get_post, name='get_post'),
+    path(
+        'api/v1/groups/<slug>/posts/',
+        views.api_group_posts,
+        name='api_group_posts'
+    ),
+    path(
+        'api/v1/profiles/<str:username>/posts/',
+        views.api_profile_posts,
+        name='api_profile_posts'
+    ),
+    path(
+        'api/v1/follow/posts/',
+        views.api_follow_posts,
+        name='api_follow_posts'
+    ),
+    path('api/v1/export/', views.api_export, name='api_export'),
 ]
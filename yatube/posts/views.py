@@ -1,53 +1,119 @@
 """List of main models."""
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
+from posts import thumbnails
+from posts.caching import cache_feed, follow_scopes
+from posts.conditional import conditional, feed_state, post_state
+from posts.exports import export, parse_since, spool
 from posts.forms import CommentForm, PostForm
-from posts.models import Follow, Group, Post
+from posts.models import Group, Post
+from posts.paginators import (
+    PAGINATORS, CursorPaginator, EstimatedCountPaginator
+)
+from posts.search import get_search
+from posts.timelines import get_timeline
 
-from django.http import JsonResponse
-from . serializers import PostSerializer
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from . serializers import PostListSerializer, PostSerializer
 
 POSTS_PER_PAGE = 10
+API_MAX_LIMIT = 100
+API_MAX_BATCH = 100
+PAGE_LINKS_ON_EACH_SIDE = 2
+PAGE_LINKS_ON_ENDS = 1
 
 User = get_user_model()
 
 
-def get_page_context(queryset, request):
-    paginator = Paginator(queryset, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
+def get_page_context(queryset, request, feed=None, count_hint=None):
+    """Paginate a feed in the mode chosen for it in POSTS_PAGINATION.
+
+    ``count_hint`` is a known size of the feed (a denormalized counter)
+    for paginators that can use it instead of COUNT(*).
+    """
+    modes = getattr(settings, 'POSTS_PAGINATION', {})
+    mode = modes.get(feed, modes.get('default', 'offset'))
+    paginator_class = PAGINATORS[mode]
+    options = {}
+    if issubclass(paginator_class, EstimatedCountPaginator):
+        options['count_hint'] = count_hint
+        # Set by cache_feed: a new version of the feed is counted anew.
+        options['count_version'] = getattr(request, 'feed_version', None)
+    paginator = paginator_class(queryset, POSTS_PER_PAGE, **options)
+    page_kwarg = getattr(paginator_class, 'page_kwarg', 'page')
+    page_number = request.GET.get(page_kwarg)
     page_obj = paginator.get_page(page_number)
-    return {
+    # Other parameters, like the search query, are kept in page links.
+    page_params = request.GET.copy()
+    page_params.pop(page_kwarg, None)
+    context = {
         'paginator': paginator,
         'page_number': page_number,
         'page_obj': page_obj,
+        'page_params': page_params.urlencode(),
     }
+    if page_obj.number is not None:
+        context['page_range'] = list(paginator.get_elided_page_range(
+            page_obj.number,
+            on_each_side=PAGE_LINKS_ON_EACH_SIDE,
+            on_ends=PAGE_LINKS_ON_ENDS,
+        ))
+    return context
+
+
+def index_scope(request):
+    return 'index'
+
+
+def group_scope(request, slug):
+    return f'group:{slug}'
+
 
+def profile_scope(request, username):
+    return f'author:{username}'
 
-@cache_page(20, key_prefix='index_page')
+
+def follow_scope(request):
+    return follow_scopes(request.user.pk)
+
+
+@conditional(feed_state(index_scope))
+@cache_feed(index_scope)
 def index(request):
-    context = get_page_context(Post.objects.all(), request)
+    context = get_page_context(
+        Post.objects.select_related('author', 'group'), request, 'index'
+    )
     return render(request, 'posts/index.html', context)
 
 
+@conditional(feed_state(group_scope))
+@cache_feed(group_scope)
 def group_posts(request, slug):
     """Prepare data for the group-list page."""
     group = get_object_or_404(Group, slug=slug)
     context = {
         'group': group,
     }
-    context.update(get_page_context(group.posts.all(), request))
+    context.update(get_page_context(
+        group.posts.select_related('author'), request, 'group_list',
+        count_hint=group.posts_count,
+    ))
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional(feed_state(profile_scope))
+@cache_feed(profile_scope)
 def profile(request, username):
     """Prepare data for the user profile page."""
 
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     following = (
         author.following.filter(user_id=request.user.id)
     ).exists()
@@ -55,17 +121,42 @@ def profile(request, username):
         'author': author,
         'following': following,
     }
-    context.update(get_page_context(author.posts.all(), request))
+    # Users made before the counters have no stats until ``recount``.
+    stats = getattr(author, 'stats', None)
+    context.update(get_page_context(
+        author.posts.select_related('group'), request, 'profile',
+        count_hint=stats and stats.posts_count,
+    ))
     return render(request, template, context)
 
 
+def search(request):
+    """Posts matching ``?q=``, most relevant first."""
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+    }
+    context.update(get_page_context(
+        get_search().ranked(
+            Post.objects.select_related('author', 'group'), query
+        ),
+        request, 'search',
+    ))
+    return render(request, 'posts/search.html', context)
+
+
+@conditional(lambda request, post_id: post_state(
+    Post.objects, post_id, 'comments_count', 'author__stats__posts_count'
+))
 def post_detail(request, post_id):
     """Prepare data for the post details page."""
 
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = post.comments.select_related('author')
     context = {
         'post': post,
         'comments': comments,
@@ -87,7 +178,9 @@ def post_create(request):
         if form.is_valid():
             post = form.save(commit=False)
             post.author_id = request.user.id
+            thumbnails.reset(post)
             post.save()
+            thumbnails.enqueue(post)
             return redirect('posts:profile', request.user.username)
 
     context = {
@@ -109,7 +202,11 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        post = form.save(commit=False)
+        if 'image' in form.changed_data:
+            thumbnails.reset(post)
+        post.save()
+        thumbnails.enqueue(post)
         return redirect('posts:post_detail', post_id)
     context = {
         'post': post,
@@ -133,26 +230,25 @@ def add_comment(request, post_id):
 
 
 @login_required
+@conditional(feed_state(follow_scope))
+@cache_feed(follow_scope)
 def follow_index(request):
     """Follow_index strip."""
-    author = Follow.objects.filter(user_id=request.user.id).values('author_id')
-    authors = Post.objects.filter(author_id__in=author)
-    context = get_page_context(authors, request)
+    posts = get_timeline().feed(request.user).select_related(
+        'author', 'group'
+    )
+    context = get_page_context(posts, request, 'follow_index')
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
 def profile_follow(request, username):
     """Subscribe to author."""
-    template = redirect('posts:profile', username=username)
     author = get_object_or_404(User, username=username)
-    is_following = (
-        author.following.filter(user_id=request.user.id).exists()
-    )
-    if (username == request.user.username) or (is_following):
-        return template
-    author.following.create(user_id=request.user.id)
-    return template
+    if author != request.user:
+        # unique_follow makes the lookup an index probe and the insert safe
+        author.following.get_or_create(user_id=request.user.id)
+    return redirect('posts:profile', username=username)
 
 
 @login_required
@@ -163,8 +259,152 @@ def profile_unfollow(request, username):
     return redirect('posts:profile', username=username)
 
 
+@conditional(lambda request, pk: post_state(Post.objects, pk))
 def get_post(request, pk):
     if request.method == 'GET':
         post = get_object_or_404(Post, id=pk)
         serializer = PostSerializer(post)
-        return JsonResponse(serializer.data)
\ No newline at end of file
+        return JsonResponse(serializer.data)
+
+
+def split_param(request, name):
+    value = request.GET.get(name, '')
+    return [item for item in value.split(',') if item]
+
+
+def api_error(detail, status=400):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def get_api_fields(request):
+    """Parse ``?fields=`` and ``?expand=``, None if a name is unknown."""
+    fields = split_param(request, 'fields')
+    expand = split_param(request, 'expand')
+    unknown = (
+        set(fields) - set(PostListSerializer.Meta.fields)
+    ) | (set(expand) - set(PostListSerializer.EXPANDABLE))
+    if unknown:
+        return None, None, f'Unknown fields: {", ".join(sorted(unknown))}'
+    return fields, expand, None
+
+
+def get_api_page(request, queryset):
+    """Cursor page of posts for an API feed.
+
+    Supports ``?fields=`` sparse fieldsets, ``?expand=author,group``
+    embedding (loaded with select_related), ``?limit=`` and ``?cursor=``.
+    """
+    fields, expand, error = get_api_fields(request)
+    if error:
+        return api_error(error)
+    try:
+        limit = min(int(request.GET.get('limit', POSTS_PER_PAGE)),
+                    API_MAX_LIMIT)
+    except ValueError:
+        limit = POSTS_PER_PAGE
+    if expand:
+        queryset = queryset.select_related(*expand)
+    page = CursorPaginator(queryset, max(limit, 1)).get_page(
+        request.GET.get('cursor')
+    )
+    serializer = PostListSerializer(
+        page.object_list, many=True, fields=fields, expand=expand,
+        context={'request': request},
+    )
+
+    def link(cursor):
+        if cursor is None:
+            return None
+        query = request.GET.copy()
+        query['cursor'] = cursor
+        return request.build_absolute_uri(f'?{query.urlencode()}')
+
+    return JsonResponse({
+        'results': serializer.data,
+        'next': link(page.next_cursor),
+        'previous': link(page.previous_cursor),
+    })
+
+
+def get_api_batch(request):
+    """Posts by ``?ids=``, in the requested order, with one IN query."""
+    try:
+        ids = list(dict.fromkeys(
+            int(pk) for pk in split_param(request, 'ids')
+        ))
+    except ValueError:
+        return api_error('ids must be a comma-separated list of integers.')
+    if len(ids) > API_MAX_BATCH:
+        return api_error(f'No more than {API_MAX_BATCH} ids per request.')
+    fields, expand, error = get_api_fields(request)
+    if error:
+        return api_error(error)
+    posts = Post.objects.select_related(*expand).in_bulk(ids)
+    serializer = PostListSerializer(
+        [posts[pk] for pk in ids if pk in posts], many=True,
+        fields=fields, expand=expand, context={'request': request},
+    )
+    return JsonResponse({
+        'results': serializer.data,
+        'missing': [pk for pk in ids if pk not in posts],
+    })
+
+
+def api_posts(request):
+    """All posts, newest first, or a batch of posts by ``?ids=``."""
+    if 'ids' in request.GET:
+        return get_api_batch(request)
+    return get_api_page(request, Post.objects.all())
+
+
+def api_group_posts(request, slug):
+    """Posts of a group."""
+    group = get_object_or_404(Group, slug=slug)
+    return get_api_page(request, group.posts.all())
+
+
+def api_profile_posts(request, username):
+    """Posts of an author."""
+    author = get_object_or_404(User, username=username)
+    return get_api_page(request, author.posts.all())
+
+
+def api_follow_posts(request):
+    """Posts of the authors the user follows."""
+    if not request.user.is_authenticated:
+        return api_error(
+            'Authentication credentials were not provided.', status=401
+        )
+    return get_api_page(request, get_timeline().feed(request.user))
+
+
+def api_export(request):
+    """Stream every table as NDJSON, gzip-compressed with ``?gzip=1``.
+
+    ``?since=`` takes the watermark of the previous export. The export
+    holds every user's data, so it is open to staff only.
+    """
+    if not request.user.is_authenticated:
+        return api_error(
+            'Authentication credentials were not provided.', status=401
+        )
+    if not request.user.is_staff:
+        return api_error(
+            'You do not have permission to perform this action.', status=403
+        )
+    since = request.GET.get('since')
+    try:
+        since = parse_since(since) if since else None
+    except ValueError as error:
+        return api_error(str(error))
+    compress = request.GET.get('gzip') in ('1', 'true')
+    filename = 'yatube.ndjson.gz' if compress else 'yatube.ndjson'
+    content_type = 'application/gzip' if compress else 'application/x-ndjson'
+    stream = export(since, compress=compress)
+    if isinstance(request, ASGIRequest):
+        # The body is read on the event loop, where queries are forbidden.
+        response = FileResponse(spool(stream), content_type=content_type)
+    else:
+        response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,21 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``
+and switches the feeds to their async views (``POSTS_ASYNC_VIEWS``).
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+os.environ.setdefault('POSTS_ASYNC_VIEWS', '1')
+
+# The synchronous code of all requests shares one thread: a thread per
+# request (ThreadSensitiveContext) measured slower under loadtest, and
+# independent queries go to worker threads through core.aio.gather.
+application = get_asgi_application()
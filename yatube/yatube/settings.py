@@ -18,11 +18,18 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Кэш в памяти процесса не видит сбросов из других воркеров; при
+# нескольких воркерах нужен общий Memcached (адрес в CACHE_LOCATION).
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+if os.environ.get('CACHE_LOCATION'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': os.environ['CACHE_LOCATION'],
+    }
 
 
 # Quick-start development settings - unsuitable for production
@@ -55,7 +62,6 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
@@ -71,6 +77,8 @@ INSTALLED_APPS = [
 # }
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,9 +86,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# Панель отладки - только при DEBUG: её middleware синхронный и под ASGI
+# заставлял бы всю цепочку переключать потоки.
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
@@ -163,6 +176,125 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Режим пагинации лент: 'offset' (номера страниц с точным COUNT),
+# 'estimated' (номера страниц с оценкой числа постов) или 'cursor'
+# (ключ (pub_date, id), без COUNT и OFFSET). Ключи - имена лент.
+POSTS_PAGINATION = {
+    'default': 'estimated',
+    'index': 'estimated',
+    'group_list': 'estimated',
+    'profile': 'estimated',
+    'follow_index': 'estimated',
+    # Поиск упорядочен по релевантности и считается точно по индексу.
+    'search': 'offset',
+}
+# Выборки меньше порога считаются точно, остальные - по оценке;
+# точное число без оценки кэшируется на POSTS_COUNT_CACHE_TIMEOUT секунд.
+POSTS_EXACT_COUNT_THRESHOLD = 1000
+POSTS_COUNT_CACHE_TIMEOUT = 60
+
+# Материализованные ленты подписок: посты раскладываются подписчикам
+# при публикации; авторы с числом подписчиков больше FANOUT_THRESHOLD
+# подмешиваются в ленту при чтении. Ленты длиннее MAX_LENGTH обрезаются
+# пачкой не чаще раза в TRIM_INTERVAL секунд.
+POSTS_TIMELINE = {
+    'BACKEND': 'posts.timelines.DatabaseTimeline',
+    'MAX_LENGTH': 800,
+    'FANOUT_THRESHOLD': 1000,
+    'TRIM_INTERVAL': 300,
+}
+
+# Страницы лент живут в кэше, пока их не сбросит запись в модели
+# (posts/signals.py); таймаут - лишь страховка. С кэшем в памяти
+# процесса сбросы других процессов не видны, и страница живёт не
+# дольше POSTS_FEED_LOCAL_CACHE_TIMEOUT секунд.
+POSTS_FEED_CACHE_TIMEOUT = 60 * 60 * 24
+POSTS_FEED_LOCAL_CACHE_TIMEOUT = 30
+
+# Миниатюры картинок готовятся вне запроса. MODE: 'inline' (сразу),
+# 'thread' (пул потоков процесса), 'queue' (задача очереди TASKS) или
+# 'process' (отдельный воркер manage.py generate_thumbnails). Пока
+# миниатюр нет, показываем оригинал.
+POSTS_THUMBNAILS = {
+    'MODE': 'queue',
+    'WORKERS': 2,
+    'GEOMETRIES': [
+        ('960x339', {'crop': 'center', 'upscale': True}),
+    ],
+}
+
+# Адаптивные варианты картинок постов для <picture>/srcset. AVIF
+# пишется, только если его поддерживает установленный Pillow.
+POSTS_IMAGE_VARIANTS = {
+    'WIDTHS': [320, 640, 960],
+    'FORMATS': ['avif', 'webp'],
+    'ASPECT': (960, 339),
+    'QUALITY': 75,
+}
+
+# Полнотекстовый поиск по постам. Бэкенд по умолчанию - таблица SQLite
+# FTS5 с ранжированием BM25; индекс пересобирает rebuild_search_index.
+# На другой СУБД поиск без индекса (posts.search.LikeSearch).
+POSTS_SEARCH = {
+    'BACKEND': 'posts.search.SQLiteSearch',
+}
+
+# Server-Timing и JSON-строка в логгер core.timing для доли SAMPLE_RATE
+# запросов: время и число запросов к базе, попадания в кэш, время
+# шаблонов и всего ответа. Остальные запросы не измеряются. Заголовок
+# виден любому клиенту, поэтому по умолчанию он есть только при DEBUG.
+SERVER_TIMING = {
+    'SAMPLE_RATE': 1.0,
+    'HEADER': DEBUG,
+    'LOG': True,
+}
+
+# Метрики Prometheus на /metrics. С TOKEN (переменная окружения
+# METRICS_TOKEN) их отдают по заголовку Authorization: Bearer <TOKEN>.
+# Без него - адресам ALLOWED_IPS (None - INTERNAL_IPS); за обратным
+# прокси все запросы идут с его адреса, так что /metrics через прокси
+# без TOKEN отдавать нельзя. Для нескольких воркеров задайте переменную
+# окружения PROMETHEUS_MULTIPROC_DIR до их запуска.
+METRICS = {
+    'ALLOWED_IPS': None,
+    'TOKEN': os.environ.get('METRICS_TOKEN'),
+}
+
+# Журнал медленных запросов к базе: запросы дольше THRESHOLD_MS пишутся
+# JSON-строками в LOG_FILE (None - только в логгер core.slowlog), доля
+# EXPLAIN_SAMPLE_RATE - с планом запроса. Сводка: manage.py slow_queries.
+SLOW_QUERIES = {
+    'THRESHOLD_MS': 100,
+    'EXPLAIN_SAMPLE_RATE': 0.1,
+    'LOG_FILE': os.path.join(BASE_DIR, 'slow_queries.log'),
+}
+
+# Очередь фоновых задач: раскладка постов по лентам, поисковый индекс,
+# миниатюры. BROKER: ImmediateBroker (сразу, в запросе), LocalBroker
+# (пул из WORKERS потоков процесса) или DatabaseBroker (таблица
+# core_task, воркеры manage.py run_workers). Упавшая задача повторяется
+# через BACKOFF ** попытка секунд; воркер, не закончивший задачу за LEASE
+# секунд, считается упавшим. Выполненные задачи хранятся KEEP_DONE секунд.
+# Без DEBUG задачи ждут воркеров: без run_workers посты не попадут в ленты
+# подписок и поиск, а миниатюры не появятся. При DEBUG (runserver) задачи
+# выполняются сразу.
+TASKS = {
+    'BROKER': (
+        'core.tasks.ImmediateBroker' if DEBUG else 'core.tasks.DatabaseBroker'
+    ),
+    'WORKERS': 4,
+    'RETRIES': 3,
+    'BACKOFF': 2,
+    'LEASE': 300,
+    'KEEP_DONE': 7 * 24 * 60 * 60,
+}
+
+# Асинхронные версии лент и API поста (posts/async_views.py). Их включает
+# yatube/asgi.py, под WSGI остаются синхронные представления. Встроенные
+# middleware Django 3.2 под ASGI переключают потоки на каждом запросе,
+# так что ASGI всё ещё медленнее WSGI (loadtest --server both).
+POSTS_ASYNC_VIEWS = os.environ.get('POSTS_ASYNC_VIEWS') == '1'
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 INTERNAL_IPS = [